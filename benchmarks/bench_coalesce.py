@@ -0,0 +1,76 @@
+"""Coalescing output events: size, event count and parse time per window.
+
+    python3 benchmarks/bench_coalesce.py [--events N] [--window SECONDS ...]
+
+Rewrites a synthetic session with edit.CoalesceTransformation for each
+window and checks, with pyte, that the screen at the end of every frame is
+the same as in the original.
+"""
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyte
+
+import castio
+import edit
+import split
+from synthetic import write_cast
+
+
+def frame_screens(path, window):
+    """(frame, display) at the end of every frame that has events. Only the
+    rows pyte marked dirty are rendered again."""
+    with castio.CastReader(path) as reader:
+        header = reader.header
+        screen = pyte.Screen(header['width'], header['height'])
+        stream = pyte.Stream(screen)
+        lines = [''] * screen.lines
+        screens = []
+        current = None
+
+        def snapshot():
+            for y in screen.dirty:
+                if y < screen.lines:
+                    lines[y] = split.render_line(screen, y)
+            screen.dirty.clear()
+            screens.append((current, tuple(lines)))
+
+        for time, event_type, data in reader.records():
+            frame = math.ceil(time / window)
+            if current is not None and frame != current:
+                snapshot()
+            if event_type == 'o':
+                stream.feed(data)
+            current = frame
+        snapshot()
+    return screens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--window', type=float, nargs='+', default=[1 / 60, 0.05, 0.1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_cast(os.path.join(tmp, 'session.cast'), args.events)
+        size, events, seconds = edit.cast_stats(source)
+        print(f"original: {size:>12,} bytes {events:>8,} events  parse {seconds * 1000:>7.1f} ms")
+        for window in args.window:
+            path = os.path.join(tmp, 'coalesced.cast')
+            shutil.copy(source, path)
+            edit.StreamingTransformer(edit.CoalesceTransformation(window), path, path, False).transform()
+            new_size, new_events, new_seconds = edit.cast_stats(path)
+            assert frame_screens(path, window) == frame_screens(source, window), f"frames differ at {window}s"
+            print(f"{window * 1000:>6.1f} ms: {new_size:>12,} bytes {new_events:>8,} events  "
+                  f"parse {new_seconds * 1000:>7.1f} ms ({seconds / new_seconds:.1f}x), frames identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Quantizing a cast: one Event object per line vs. the columnar EventStream.
+
+    python3 benchmarks/bench_edit.py [--events N]
+
+The legacy pass decodes every line into an Event with an instance dict and
+quantizes in two Python loops, as edit.py used to; the columnar pass is
+edit.Transformer as it stands (NumPy when installed). Reports decode,
+quantize and encode time, peak traced memory and checks both outputs match.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import castio
+import edit
+from synthetic import write_cast
+
+
+class LegacyEvent:
+    def __init__(self, time, event_type, data):
+        self.time = time
+        self.type = event_type
+        self.data = data
+
+
+def legacy_decode(path):
+    with castio.CastReader(path) as reader:
+        header = edit.Header(**reader.header)
+        events = [LegacyEvent(*event.record) for event in reader]
+    return header, events
+
+
+def legacy_quantize(events, ranges):
+    deltas = [0] * len(events)
+    for i in range(len(events) - 1):
+        delta = events[i + 1].time - events[i].time
+        for q_range in ranges:
+            if q_range.in_range(delta):
+                delta = q_range.From
+                break
+        deltas[i] = delta
+    for i in range(len(events) - 1):
+        events[i + 1].time = events[i].time + deltas[i]
+
+
+def legacy_encode(path, header, events):
+    with castio.CastWriter(path) as writer:
+        writer.write_header(header.__dict__)
+        for event in events:
+            writer.write([event.time, event.type, event.data])
+
+
+def columnar_decode(path):
+    with open(path, 'rb') as f:
+        return edit.Cast.decode(f, True)
+
+
+def columnar_encode(path, cast):
+    with open(path, 'wb') as f:
+        edit.Cast.encode(f, cast, True)
+
+
+def run_legacy(path, output, ranges):
+    timings = []
+    start = time.perf_counter()
+    header, events = legacy_decode(path)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    legacy_quantize(events, ranges)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    legacy_encode(output, header, events)
+    timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_columnar(path, output, ranges):
+    timings = []
+    start = time.perf_counter()
+    cast = columnar_decode(path)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    edit.QuantizeTransformation(ranges).transform(cast, True)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    columnar_encode(output, cast)
+    timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_memory(path, decode):
+    tracemalloc.start()
+    result = decode(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    args = parser.parse_args()
+
+    ranges = edit.parse_quantize_ranges(["0.5,1", "2"], True)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.cast')
+        write_cast(path, args.events)
+        results = {}
+        for name, run, decode in (('legacy', run_legacy, legacy_decode), ('columnar', run_columnar, columnar_decode)):
+            output = os.path.join(tmp, f'{name}.cast')
+            timings = run(path, output, ranges)
+            with open(output, 'rb') as f:
+                results[name] = (timings, peak_memory(path, decode), f.read())
+
+    assert results['legacy'][2] == results['columnar'][2], "outputs differ"
+    backend = 'numpy' if edit.numpy is not None else 'pure Python'
+    print(f"{args.events} events, columnar backend: {backend}, outputs identical")
+    print(f"{'':>10} {'decode':>8} {'quantize':>9} {'encode':>8} {'peak':>10}")
+    for name, (timings, peak, _) in results.items():
+        decode, quantize, encode = timings
+        print(f"{name:>10} {decode:>7.2f}s {quantize:>8.3f}s {encode:>7.2f}s {peak / 1e6:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""edit.quantize_action over a splits directory: first run, rerun, new data.
+
+    python3 benchmarks/bench_quantize_action.py [--splits N] [--events N] [--jobs N]
+
+The first run quantizes every split; a rerun with nothing new should only
+stat the directory, and adding splits should cost about as much as
+quantizing just those.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import edit
+from synthetic import write_cast
+
+
+def timed_run(root, jobs):
+    start = time.perf_counter()
+    edit.quantize_action(root, False, jobs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--splits', type=int, default=200)
+    parser.add_argument('--events', type=int, default=2000, help='Events per split.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        splits_dir = os.path.join(root, 'static', 'splits')
+        os.makedirs(splits_dir)
+        for index in range(args.splits):
+            write_cast(os.path.join(splits_dir, f'split_{index}.cast'), args.events, seed=index)
+        first = timed_run(root, args.jobs)
+        rerun = timed_run(root, args.jobs)
+        added = max(1, args.splits // 10)
+        for index in range(args.splits, args.splits + added):
+            write_cast(os.path.join(splits_dir, f'split_{index}.cast'), args.events, seed=index)
+        incremental = timed_run(root, args.jobs)
+
+    print(f"{args.splits} splits of {args.events} events, {args.jobs} jobs")
+    print(f"  first run:         {first:>7.2f}s")
+    print(f"  rerun, no changes: {rerun:>7.2f}s")
+    print(f"  {added:>3} new splits:    {incremental:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
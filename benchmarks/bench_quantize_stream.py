@@ -0,0 +1,53 @@
+"""Peak memory of quantizing a cast in place: Transformer vs. StreamingTransformer.
+
+    python3 benchmarks/bench_quantize_stream.py [--events N [N ...]]
+
+Transformer decodes the whole cast before writing it back; the streaming
+transformer re-times events as it reads them, so its peak traced memory
+should stay flat as the cast grows. Also checks both write the same bytes.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import edit
+from synthetic import write_cast
+
+
+def measure(transformer_class, transformation, source, path):
+    shutil.copy(source, path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    transformer_class(transformation, path, path, False).transform()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(path, 'rb') as f:
+        return peak, elapsed, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    transformation = edit.QuantizeTransformation(edit.parse_quantize_ranges(["2"], True))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'events':>8} {'whole cast':>20} {'streaming':>20}")
+        for count in args.events:
+            source = write_cast(os.path.join(tmp, f'input_{count}.cast'), count)
+            output = os.path.join(tmp, 'output.cast')
+            peak, elapsed, expected = measure(edit.Transformer, transformation, source, output)
+            stream_peak, stream_elapsed, streamed = measure(edit.StreamingTransformer, transformation, source, output)
+            assert streamed == expected, "streaming output differs"
+            print(f"{count:>8} {peak / 1e6:>9.1f}MB {elapsed:>7.2f}s {stream_peak / 1e6:>9.1f}MB {stream_elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Redaction throughput: regex-only rules vs. rules plus the entropy detector.
+
+    python3 benchmarks/bench_redact.py [--events N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redact
+from synthetic import generate_events, write_cast
+
+
+def time_events(redactor, texts):
+    start = time.perf_counter()
+    for text in texts:
+        redactor.redact(text)
+    return time.perf_counter() - start
+
+
+def time_file(redactor, input_path, output_path):
+    start = time.perf_counter()
+    redact.process_cast_file(input_path, output_path, force=True, redactor=redactor)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    args = parser.parse_args()
+
+    texts = [event[2] for event in generate_events(args.events)]
+    total_bytes = sum(len(text) for text in texts)
+    configurations = [
+        ("regex only", redact.Redactor()),
+        ("regex + entropy", redact.Redactor(detectors=[redact.EntropyDetector()])),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = write_cast(os.path.join(tmp, 'input.cast'), args.events)
+        output_path = os.path.join(tmp, 'output.cast')
+        print(f"{args.events} events, {total_bytes / 1e6:.1f} MB of output text")
+        baseline = None
+        for name, redactor in configurations:
+            in_memory = time_events(redactor, texts)
+            end_to_end = time_file(redactor, input_path, output_path)
+            baseline = baseline or (in_memory, end_to_end)
+            print(f"{name:>16}: redact() {args.events / in_memory:>10,.0f} events/s "
+                  f"({in_memory / baseline[0]:.2f}x)   process_cast_file {end_to_end:6.2f}s "
+                  f"({end_to_end / baseline[1]:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Split prompt detection: full-screen rendering per event vs. dirty-line tracking.
+
+    python3 benchmarks/bench_split.py [--events N]
+
+Both loops feed the same events through pyte; the legacy loop then renders
+and scans the whole 236x49 display as split.py used to, the tracked loop
+only re-renders rows pyte marked dirty.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyte
+
+import split
+from synthetic import generate_events
+
+
+def legacy_commands(events):
+    screen = split.PatchedScreen(236, 49)
+    stream = pyte.Stream(screen)
+    commands = []
+    for event in events:
+        stream.feed(event[2])
+        current_display = "\n".join(screen.display)
+        split.extract_plain_text(screen.display)
+        if re.search(r'└─\$|➜', current_display):
+            commands.append(split.extract_command(current_display))
+        else:
+            commands.append(None)
+    return commands
+
+
+def tracked_commands(events):
+    screen = split.PatchedScreen(236, 49)
+    stream = pyte.Stream(screen)
+    tracker = split.DisplayTracker(screen)
+    commands = []
+    for event in events:
+        stream.feed(event[2])
+        tracker.update()
+        commands.append(tracker.command)
+    return commands
+
+
+def timed(function, events):
+    start = time.perf_counter()
+    result = function(events)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000)
+    args = parser.parse_args()
+
+    events = list(generate_events(args.events))
+    legacy, legacy_time = timed(legacy_commands, events)
+    tracked, tracked_time = timed(tracked_commands, events)
+    if legacy != tracked:
+        sys.exit("dirty-line tracking disagrees with full-screen detection")
+
+    print(f"{args.events} events")
+    print(f"   full display: {args.events / legacy_time:>10,.0f} events/s")
+    print(f"  dirty tracker: {args.events / tracked_time:>10,.0f} events/s "
+          f"({legacy_time / tracked_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Peak memory of split.process_cast_file as a single segment grows.
+
+    python3 benchmarks/bench_split_memory.py [--events N [N ...]]
+
+Each input is one long command whose output runs for N events, the worst
+case for a splitter that holds a segment in memory until the next prompt.
+Peak traced allocations should stay flat while the segment grows.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import split
+
+PROMPT = ("\x1b]0;kali@kali: ~\x07\x1b[1;34m┌──(\x1b[1;31mkali㉿kali\x1b[1;34m)-[\x1b[0m~\x1b[1;34m]"
+          "\r\n└─\x1b[1;31m$\x1b[0m ")
+
+
+def write_long_segment(path, count):
+    with open(path, 'w') as f:
+        f.write(json.dumps({"version": 2, "width": 236, "height": 49}) + "\n")
+        t = 0.0
+        f.write(json.dumps([t, "o", PROMPT]) + "\n")
+        for ch in "nmap -p- -sV 10.0.0.0/24\r\n":
+            t += 0.05
+            f.write(json.dumps([round(t, 6), "o", ch]) + "\n")
+        for i in range(count):
+            t += 0.001
+            line = f"10.0.0.{i % 256}:{i % 65536}/tcp open  service-{i:08d} " + "x" * 150 + "\r\n"
+            f.write(json.dumps([round(t, 6), "o", line]) + "\n")
+        f.write(json.dumps([round(t + 1, 6), "o", PROMPT]) + "\n")
+    return path
+
+
+def measure(input_path, output_dir):
+    tracemalloc.start()
+    start = time.perf_counter()
+    segments, _ = split.process_cast_file(input_path, output_dir)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    largest = max(os.path.getsize(os.path.join(output_dir, name)) for name, _, _ in segments)
+    return peak, largest, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, nargs='+', default=[1000, 4000, 16000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'events':>8} {'segment':>10} {'peak':>10} {'time':>8}")
+        for count in args.events:
+            output_dir = os.path.join(tmp, f'splits_{count}')
+            os.makedirs(output_dir)
+            input_path = write_long_segment(os.path.join(tmp, f'input_{count}.cast'), count)
+            peak, largest, elapsed = measure(input_path, output_dir)
+            print(f"{count:>8} {largest / 1e6:>8.1f}MB {peak / 1e6:>8.2f}MB {elapsed:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
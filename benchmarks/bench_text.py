@@ -0,0 +1,62 @@
+"""Text extraction: final screen only vs. scrollback-aware transcripts.
+
+    python3 benchmarks/bench_text.py [--events N]
+
+The legacy pass feeds every event to a stock 236x49 pyte screen and keeps
+`screen.display`; split.process_with_terminal_emulator also keeps the lines
+that scroll off. Reports throughput and how many output lines each keeps.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyte
+
+import castio
+import split
+from synthetic import write_cast
+
+
+class LegacyScreen(pyte.Screen):
+    def select_graphic_rendition(self, *attrs, private=False):
+        super().select_graphic_rendition(*attrs)
+
+
+def legacy_text(path):
+    screen = LegacyScreen(236, 49)
+    stream = pyte.Stream(screen)
+    with castio.CastReader(path) as reader:
+        for record in reader.records():
+            stream.feed(record[2])
+    return "\n".join(screen.display)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.cast')
+        write_cast(path, args.events)
+        legacy, legacy_time = timed(legacy_text, path)
+        text, text_time = timed(split.process_with_terminal_emulator, path, os.path.join(tmp, 'session.txt'))
+
+    print(f"{args.events} events")
+    print(f"  final screen: {args.events / legacy_time:>10,.0f} events/s {legacy.count(chr(10)) + 1:>8} lines")
+    print(f"    scrollback: {args.events / text_time:>10,.0f} events/s {text.count(chr(10)) + 1:>8} lines "
+          f"({legacy_time / text_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""A chain of edit.py transformations: one pass vs. one pass per transformation.
+
+    python3 benchmarks/bench_transform_chain.py [--events N] [--transform SPEC ...]
+
+Both runs rewrite the same cast in place with StreamingTransformer; the
+chained run reads and writes it once, the other once per transformation.
+Checks both produce the same bytes.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import edit
+from synthetic import write_cast
+
+
+def rewrite(path, transformations):
+    start = time.perf_counter()
+    for transformation in transformations:
+        edit.StreamingTransformer(transformation, path, path, False).transform()
+    elapsed = time.perf_counter() - start
+    with open(path, 'rb') as f:
+        return f.read(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--transform', action='append', metavar='SPEC')
+    args = parser.parse_args()
+    specs = args.transform or ["drop-input", "idle:1.5", "quantize:0.5,1:2", "speed:1.25"]
+
+    chain = edit.parse_transformations(specs, True)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_cast(os.path.join(tmp, 'session.cast'), args.events)
+        path = os.path.join(tmp, 'output.cast')
+        shutil.copy(source, path)
+        separate, separate_time = rewrite(path, chain.transformations)
+        shutil.copy(source, path)
+        chained, chained_time = rewrite(path, [chain])
+
+    assert chained == separate, "chained output differs"
+    print(f"{args.events} events, {chain.fingerprint()}")
+    print(f"  one pass each: {separate_time:>6.2f}s")
+    print(f"  single pass:   {chained_time:>6.2f}s ({separate_time / chained_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
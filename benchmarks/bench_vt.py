@@ -0,0 +1,58 @@
+"""Split with the pyte engine vs. the built-in vt engine.
+
+    python3 benchmarks/bench_vt.py [--events N] [RECORDING ...]
+
+Runs split.process_cast_file over the same session once per engine and
+checks both produce the same segments, byte for byte. Uses the given
+recordings (e.g. nmap or hashcat sessions from static/full), or a synthetic
+session when there are none.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import castio
+import split
+from synthetic import write_cast
+
+
+def run(path, output_dir, engine):
+    os.makedirs(output_dir)
+    start = time.perf_counter()
+    segments, _ = split.process_cast_file(path, output_dir, engine=engine)
+    elapsed = time.perf_counter() - start
+    contents = []
+    for name, _, _ in segments:
+        with open(os.path.join(output_dir, name), 'rb') as f:
+            contents.append((name, f.read()))
+    return contents, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('recordings', nargs='*')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.recordings or [write_cast(os.path.join(tmp, 'session.cast'), args.events)]
+        for index, path in enumerate(paths):
+            events = castio.count_events(path, os.path.getsize(path))
+            timings = {}
+            results = {}
+            for engine in split.ENGINES:
+                results[engine], timings[engine] = run(path, os.path.join(tmp, f"{index}.{engine}"), engine)
+
+            assert results['vt'] == results['pyte'], f"engines produced different segments for {path}"
+            print(f"{os.path.basename(path)}: {events} events, {len(results['pyte'])} segments (identical)")
+            for engine in split.ENGINES:
+                print(f"  {engine:>4}: {events / timings[engine]:>10,.0f} events/s "
+                      f"({timings['pyte'] / timings[engine]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Casts are handled as bytes so events keep their offsets and can be copied
+# through without re-encoding.
+
+# Records are written the way orjson writes them, compact and with text left
+# as UTF-8, whichever backend is installed. Only float exponents still differ
+# (orjson writes 1e-7 where json writes 1e-07).
+SEPARATORS = (',', ':')
+
+
+def _json_dumpb(obj):
+    try:
+        return json.dumps(obj, separators=SEPARATORS, ensure_ascii=False).encode('utf-8')
+    except UnicodeEncodeError:
+        # Lone surrogates can only be written escaped.
+        return json.dumps(obj, separators=SEPARATORS).encode('utf-8')
+
+
+if orjson is not None:
+    def loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some inputs json accepts (e.g. lone surrogates).
+            return json.loads(data)
+
+    def dumpb(obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            return _json_dumpb(obj)
+else:
+    loads = json.loads
+    dumpb = _json_dumpb
+
+
+def dumps(obj):
+    return dumpb(obj).decode('utf-8')
+
+
+def temp_file(path, mode='wb'):
+    """(file, temp path) of a new file beside `path` to os.replace() onto it.
+
+    mkstemp keeps the name unique across threads as well as processes; the
+    file takes the mode of the one it replaces, or rw-r--r-- for a new one.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+    except FileNotFoundError:
+        os.chmod(temp_path, 0o644)
+    return os.fdopen(fd, mode), temp_path
+
+
+class Event:
+    """One event line and its byte offset, decoded on first access."""
+
+    __slots__ = ('raw', 'offset', '_record')
+
+    def __init__(self, raw, offset=0, record=None):
+        self.raw = raw
+        self.offset = offset
+        self._record = record
+
+    @property
+    def end(self):
+        return self.offset + len(self.raw) + 1
+
+    @property
+    def record(self):
+        if self._record is None:
+            self._record = loads(self.raw)
+        return self._record
+
+    @property
+    def time(self):
+        return self.record[0]
+
+    @property
+    def type(self):
+        return self.record[1]
+
+    @property
+    def data(self):
+        return self.record[2]
+
+    def is_output(self):
+        record = self.record
+        return isinstance(record, list) and len(record) > 2 and record[1] == 'o'
+
+
+class CastReader:
+
+    def __init__(self, source, offset=0):
+        if isinstance(source, (str, bytes, os.PathLike)):
+            self._file = open(source, 'rb')
+            self._owns_file = True
+        else:
+            self._file = source
+            self._owns_file = False
+        self._header_line = None
+        self._position = 0
+        self.events_read = 0
+        if offset:
+            self._file.seek(offset)
+            self._position = offset
+            self._header_line = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    @property
+    def header_line(self):
+        if self._header_line is None:
+            self._header_line = b''
+            for line in self._file:
+                self._position += len(line)
+                line = line.rstrip(b'\r\n')
+                if line.strip():
+                    self._header_line = line
+                    break
+        return self._header_line
+
+    @property
+    def header(self):
+        return loads(self.header_line) if self.header_line else None
+
+    def __iter__(self):
+        self.header_line
+        position = self._position
+        for line in self._file:
+            offset = position
+            position += len(line)
+            self._position = position
+            raw = line.rstrip(b'\r\n')
+            if raw.strip():
+                self.events_read += 1
+                yield Event(raw, offset)
+
+    def records(self, on_error=None):
+        for event in self:
+            try:
+                yield event.record
+            except ValueError as e:
+                if on_error:
+                    on_error(event, e)
+
+    @property
+    def position(self):
+        return self._position
+
+
+class CastWriter:
+    """Buffered writer; with `atomic` a temp file replaces `target` on close."""
+
+    def __init__(self, target, buffer_size=1 << 16, atomic=False, append=False):
+        self.path = None
+        self._temp_path = None
+        if isinstance(target, (str, bytes, os.PathLike)):
+            self.path = os.fspath(target)
+            if atomic:
+                self._file, self._temp_path = temp_file(self.path)
+            else:
+                self._file = open(self.path, 'ab' if append else 'wb')
+            self._owns_file = True
+        else:
+            self._file = target
+            self._owns_file = False
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write_raw(self, raw):
+        self._buffer.append(raw)
+        self._buffer.append(b'\n')
+        self._buffered += len(raw) + 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_header(self, header):
+        self.write_raw(header if isinstance(header, bytes) else dumpb(header))
+
+    def write(self, record):
+        self.write_raw(dumpb(record))
+
+    def write_event(self, event, record=None):
+        self.write_raw(event.raw if record is None else dumpb(record))
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def tell(self):
+        return self._file.tell() + self._buffered
+
+    def close(self):
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+            if self._temp_path:
+                os.replace(self._temp_path, self.path)
+                self._temp_path = None
+
+    def discard(self):
+        self._buffer = []
+        self._buffered = 0
+        if self._owns_file:
+            self._file.close()
+            if self._temp_path and os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+                self._temp_path = None
+
+
+def read_header(path):
+    with CastReader(path) as reader:
+        return reader.header
+
+
+def read_span(path, start, end):
+    """Events of `path` whose line starts at a byte offset in [start, end)."""
+    with CastReader(path, offset=start) as reader:
+        for event in reader:
+            if event.offset >= end:
+                break
+            yield event
+
+
+def segment_lines(path, start, end, time_offset):
+    """A span of a recording as split.py would write it as a segment file."""
+    with CastReader(path) as reader:
+        yield reader.header_line
+    for event in read_span(path, start, end):
+        try:
+            record = event.record
+            yield dumpb([float(record[0]) - time_offset, record[1], record[2]])
+        except (ValueError, TypeError, IndexError):
+            continue
+
+
+def span_digest(path, start, end):
+    """Hash of the event lines in [start, end) of `path`."""
+    digest = hashlib.blake2b(digest_size=16)
+    for event in read_span(path, start, end):
+        digest.update(event.raw)
+    return digest.hexdigest()
+
+
+def count_events(path, end):
+    """Number of event lines before byte offset `end`."""
+    with CastReader(path) as reader:
+        count = 0
+        for event in reader:
+            if event.offset >= end:
+                break
+            count += 1
+        return count
+
+
+def locate_events(path, first_event, end_event):
+    """(start, end, first event time) of events [first_event, end_event), or None."""
+    start = time_offset = None
+    with CastReader(path) as reader:
+        for index, event in enumerate(reader):
+            if index == first_event:
+                try:
+                    time_offset = float(event.time)
+                except (ValueError, TypeError, IndexError):
+                    return None
+                start = event.offset
+            if index == end_event - 1 and start is not None:
+                return start, event.end, time_offset
+    return None
@@ -0,0 +1,333 @@
+import json
+import os
+import sqlite3
+import threading
+
+import castio
+
+# SQLite index of split recordings, segments and favorites, written by
+# split.py and edit.py and read by server.py. A virtual segment is a byte
+# range of a redacted recording, also kept as event ordinals (redaction
+# moves bytes but never adds or removes events).
+
+CATALOG_NAME = 'catalog.sqlite3'
+LEGACY_MAPPING_NAME = 'file_timestamp_mapping.json'
+LEGACY_FAVORITES_NAME = 'favorites.txt'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    recording TEXT,
+    timestamp TEXT,
+    tool TEXT NOT NULL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS segments_by_tool ON segments (tool, timestamp, name);
+CREATE INDEX IF NOT EXISTS segments_by_recording ON segments (recording);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    recording TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    part_index INTEGER NOT NULL,
+    open_segment TEXT
+);
+CREATE TABLE IF NOT EXISTS virtual_segments (
+    name TEXT PRIMARY KEY,
+    recording TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    first_event INTEGER NOT NULL,
+    end_event INTEGER NOT NULL,
+    time_offset REAL NOT NULL,
+    source_mtime REAL NOT NULL,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS quantized (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    transform TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+"""
+
+
+def tool_name(segment):
+    return segment.split('_')[0]
+
+
+class Catalog:
+    """One connection shared by the threads of a process behind a lock."""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._synced_mtime = None
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(virtual_segments)')}
+            if 'digest' not in columns:
+                self._conn.execute('ALTER TABLE virtual_segments ADD COLUMN digest TEXT')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    # Recordings
+
+    def recording_mtime(self, name):
+        rows = self._query('SELECT mtime FROM recordings WHERE name = ?', (name,))
+        return rows[0][0] if rows else None
+
+    def record_recording(self, name, mtime, segments, checkpoint=None, spans=None):
+        spans = spans or {}
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO recordings (name, mtime) VALUES (?, ?)', (name, mtime))
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO segments (name, recording, timestamp, tool, size) VALUES (?, ?, ?, ?, ?)',
+                [(segment, name, timestamp, tool_name(segment), size) for segment, timestamp, size in segments])
+            self._conn.executemany(
+                'DELETE FROM virtual_segments WHERE name = ?',
+                [(segment,) for segment, _, _ in segments if segment not in spans])
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO virtual_segments '
+                '(name, recording, start, end, first_event, end_event, time_offset, source_mtime, digest) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(segment, name, span['start'], span['end'], span['first_event'], span['end_event'],
+                  span['time_offset'], mtime, span.get('digest')) for segment, span in spans.items()])
+            if checkpoint is None:
+                self._conn.execute('DELETE FROM checkpoints WHERE recording = ?', (name,))
+            else:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO checkpoints (recording, size, fingerprint, offset, part_index, open_segment) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (name, checkpoint['size'], checkpoint['fingerprint'], checkpoint['offset'],
+                     checkpoint['part_index'], checkpoint['open_segment']))
+
+    def checkpoint(self, name):
+        rows = self._query('SELECT size, fingerprint, offset, part_index, open_segment FROM checkpoints '
+                           'WHERE recording = ?', (name,))
+        if not rows:
+            return None
+        size, fingerprint, offset, part_index, open_segment = rows[0]
+        return {'size': size, 'fingerprint': fingerprint, 'offset': offset,
+                'part_index': part_index, 'open_segment': open_segment}
+
+    # Segments
+
+    def segments(self, tool=None, by_timestamp=False):
+        order = "COALESCE(timestamp, ''), name" if by_timestamp else 'name'
+        if tool is None:
+            rows = self._query(f'SELECT name FROM segments ORDER BY {order}')
+        else:
+            rows = self._query(f'SELECT name FROM segments WHERE tool = ? ORDER BY {order}', (tool,))
+        return [row[0] for row in rows]
+
+    def tools(self):
+        return [row[0] for row in self._query('SELECT DISTINCT tool FROM segments ORDER BY tool')]
+
+    def timestamp(self, segment):
+        rows = self._query('SELECT timestamp FROM segments WHERE name = ?', (segment,))
+        return rows[0][0] if rows else None
+
+    def add_segment(self, name, recording=None, timestamp=None, size=None):
+        self._execute('INSERT OR REPLACE INTO segments (name, recording, timestamp, tool, size) VALUES (?, ?, ?, ?, ?)',
+                      (name, recording, timestamp, tool_name(name), size))
+
+    def rename_segment(self, old_name, new_name):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM segments WHERE name = ?', (new_name,))
+            self._conn.execute('UPDATE segments SET name = ?, tool = ? WHERE name = ?',
+                               (new_name, tool_name(new_name), old_name))
+            self._conn.execute('DELETE FROM favorites WHERE name = ?', (new_name,))
+            self._conn.execute('UPDATE favorites SET name = ? WHERE name = ?', (new_name, old_name))
+            self._conn.execute('DELETE FROM virtual_segments WHERE name = ?', (new_name,))
+            self._conn.execute('UPDATE virtual_segments SET name = ? WHERE name = ?', (new_name, old_name))
+            self._conn.execute('DELETE FROM quantized WHERE name = ?', (new_name,))
+            self._conn.execute('UPDATE quantized SET name = ? WHERE name = ?', (new_name, old_name))
+            self._conn.execute('DELETE FROM transcripts WHERE name = ?', (new_name,))
+            self._conn.execute('UPDATE transcripts SET name = ? WHERE name = ?', (new_name, old_name))
+
+    def delete_segment(self, name):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM segments WHERE name = ?', (name,))
+            self._conn.execute('DELETE FROM favorites WHERE name = ?', (name,))
+            self._conn.execute('DELETE FROM virtual_segments WHERE name = ?', (name,))
+            self._conn.execute('DELETE FROM quantized WHERE name = ?', (name,))
+            self._conn.execute('DELETE FROM transcripts WHERE name = ?', (name,))
+
+    # Virtual segments
+
+    def virtual_segments(self):
+        return {row[0] for row in self._query('SELECT name FROM virtual_segments')}
+
+    def virtual_segment(self, name):
+        rows = self._query('SELECT recording, start, end, first_event, end_event, time_offset, source_mtime, digest '
+                           'FROM virtual_segments WHERE name = ?', (name,))
+        if not rows:
+            return None
+        recording, start, end, first_event, end_event, time_offset, source_mtime, digest = rows[0]
+        return {'recording': recording, 'start': start, 'end': end, 'first_event': first_event,
+                'end_event': end_event, 'time_offset': time_offset, 'source_mtime': source_mtime,
+                'digest': digest}
+
+    def resolve_virtual_segment(self, name, recordings_dir):
+        """Span of `name`, relocated by event ordinals if its lines moved."""
+        span = self.virtual_segment(name)
+        if span is None:
+            return None
+        path = os.path.join(recordings_dir, span['recording'])
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        if mtime != span['source_mtime']:
+            if span['digest'] is None or castio.span_digest(path, span['start'], span['end']) != span['digest']:
+                located = castio.locate_events(path, span['first_event'], span['end_event'])
+                if located is None:
+                    return None
+                span['start'], span['end'], span['time_offset'] = located
+                span['digest'] = castio.span_digest(path, span['start'], span['end'])
+            span['source_mtime'] = mtime
+            self._execute('UPDATE virtual_segments SET start = ?, end = ?, time_offset = ?, source_mtime = ?, '
+                          'digest = ? WHERE name = ?',
+                          (span['start'], span['end'], span['time_offset'], mtime, span['digest'], name))
+        span['path'] = path
+        return span
+
+    def sync(self, splits_dir):
+        """Pick up .cast files added or removed behind the catalog's back."""
+        try:
+            mtime = os.stat(splits_dir).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._synced_mtime:
+            return
+        on_disk = {entry.name: entry for entry in os.scandir(splits_dir)
+                   if entry.name.endswith('.cast') and entry.is_file()}
+        known = set(self.segments()) - self.virtual_segments()
+        added = [(name, None, None, tool_name(name), on_disk[name].stat().st_size)
+                 for name in on_disk.keys() - known]
+        removed = [(name,) for name in known - on_disk.keys()]
+        if added or removed:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO segments (name, recording, timestamp, tool, size) VALUES (?, ?, ?, ?, ?)',
+                    added)
+                self._conn.executemany('DELETE FROM segments WHERE name = ?', removed)
+        self._synced_mtime = mtime
+
+    # Quantized splits
+
+    def quantized(self):
+        return {name: (size, mtime_ns, transform) for name, size, mtime_ns, transform
+                in self._query('SELECT name, size, mtime_ns, transform FROM quantized')}
+
+    def record_quantized(self, entries):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO quantized (name, size, mtime_ns, transform) VALUES (?, ?, ?, ?)', entries)
+            self._conn.executemany('UPDATE segments SET size = ? WHERE name = ?',
+                                   [(size, name) for name, size, _, _ in entries])
+
+    # Transcripts
+
+    def transcripts(self):
+        return dict(self._query('SELECT name, fingerprint FROM transcripts'))
+
+    def record_transcripts(self, entries):
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO transcripts (name, fingerprint) VALUES (?, ?)', entries)
+
+    # Favorites
+
+    def favorites(self):
+        return {row[0]: True for row in self._query('SELECT name FROM favorites ORDER BY id')}
+
+    def is_favorite(self, name):
+        return bool(self._query('SELECT 1 FROM favorites WHERE name = ?', (name,)))
+
+    def add_favorite(self, name):
+        self._execute('INSERT OR IGNORE INTO favorites (name) VALUES (?)', (name,))
+
+    def remove_favorite(self, name):
+        self._execute('DELETE FROM favorites WHERE name = ?', (name,))
+
+    def toggle_favorite(self, name):
+        if self.is_favorite(name):
+            self.remove_favorite(name)
+        else:
+            self.add_favorite(name)
+
+    # Migration
+
+    def migrate(self, splits_dir, favorites_file=None):
+        """Import file_timestamp_mapping.json and favorites.txt."""
+        mapping_file = os.path.join(splits_dir, LEGACY_MAPPING_NAME)
+        mapping = {}
+        if os.path.exists(mapping_file):
+            try:
+                with open(mapping_file, 'r') as f:
+                    mapping = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading {mapping_file}: {e}")
+
+        recordings = []
+        segments = []
+        for key, value in mapping.items():
+            if os.sep not in key:
+                if isinstance(value, (int, float)):
+                    recordings.append((key, value))
+            elif os.path.basename(os.path.dirname(key)) == os.path.basename(splits_dir):
+                name = os.path.basename(key)
+                path = os.path.join(splits_dir, name)
+                size = os.path.getsize(path) if os.path.exists(path) else None
+                segments.append((name, None, value, tool_name(name), size))
+
+        favorites = []
+        if favorites_file and os.path.exists(favorites_file):
+            with open(favorites_file, 'r') as f:
+                favorites = [(line.strip(),) for line in f if line.strip()]
+
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO recordings (name, mtime) VALUES (?, ?)', recordings)
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO segments (name, recording, timestamp, tool, size) VALUES (?, ?, ?, ?, ?)',
+                segments)
+            self._conn.executemany('INSERT OR IGNORE INTO favorites (name) VALUES (?)', favorites)
+
+
+def open_catalog(splits_dir, favorites_file=None):
+    os.makedirs(splits_dir, exist_ok=True)
+    if favorites_file is None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(splits_dir)))
+        favorites_file = os.path.join(root, LEGACY_FAVORITES_NAME)
+    path = os.path.join(splits_dir, CATALOG_NAME)
+    is_new = not os.path.exists(path)
+    catalog = Catalog(path)
+    if is_new:
+        catalog.migrate(splits_dir, favorites_file)
+    return catalog
@@ -17,6 +17,7 @@ done
 if [[ "$undo" = true ]]; then
     echo "Undoing changes made by the script..."
     sed -i '/# Setup asciinema recording/,/#fi/d' "$HOME/.zshrc"
+    sed -i '/# Patronus command markers/,/# End Patronus command markers/d' "$HOME/.zshrc"
     echo "Changes undone. Please restart your shell."
     exit 0
 fi
@@ -50,4 +51,37 @@ fi
 EOF
 fi
 
+# Inside a recording, mark every prompt and command with invisible OSC 133
+# sequences so split.py can cut segments without emulating the terminal:
+#   ESC]133;A BEL                           a prompt is about to be drawn
+#   ESC]133;C;<base64 command>;<epoch> BEL  a command line starts running
+#   ESC]133;D;<exit status>;<epoch> BEL     that command finished
+if ! grep -q "Patronus command markers" "${ZSHRC}"
+then
+    echo "Adding command markers to ${ZSHRC}"
+    cat <<EOF >> "${ZSHRC}"
+
+# Patronus command markers
+if [ -n "\$ASC_REC_ACTIVE" ]; then
+    zmodload zsh/datetime
+    autoload -Uz add-zsh-hook
+    __patronus_preexec() {
+        __patronus_ran=1
+        printf '\033]133;C;%s;%s\007' "\$(printf '%s' "\$1" | base64 | tr -d '\n')" "\$EPOCHSECONDS"
+    }
+    __patronus_precmd() {
+        local exit_status=\$?
+        if [ -n "\$__patronus_ran" ]; then
+            printf '\033]133;D;%s;%s\007' "\$exit_status" "\$EPOCHSECONDS"
+            unset __patronus_ran
+        fi
+        printf '\033]133;A\007'
+    }
+    add-zsh-hook preexec __patronus_preexec
+    add-zsh-hook precmd __patronus_precmd
+fi
+# End Patronus command markers
+EOF
+fi
+
 echo -e "${GREEN}Setup complete. Please open a new terminal to start recording sessions.${RESET}"
@@ -1,9 +1,21 @@
 import argparse
+import castio
+import catalog
 import json
+import math
 import os
 import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from time import perf_counter
 from typing import List, Dict, Optional
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class ValidationError(Exception):
     pass
 
@@ -47,6 +59,8 @@ class Header:
         return True
 
 class Event:
+    __slots__ = ('time', 'type', 'data')
+
     def __init__(self, time: float, event_type: str, data: str):
         self.time = time
         self.type = event_type
@@ -66,9 +80,113 @@ class Event:
                 return False
         return True
 
+TYPE_CODES = {chr(code): code for code in range(1, 128)}
+
+class EventStream:
+    """Events stored column by column; indexing builds Event copies."""
+
+    BLOCK = 1024
+
+    __slots__ = ('times', 'types', 'offsets', 'blocks', 'buffer')
+
+    def __init__(self):
+        self.times = array('d')
+        self.types = bytearray()
+        self.offsets = array('q', [0])
+        self.blocks = array('q', [0])
+        self.buffer = bytearray()
+
+    @classmethod
+    def from_events(cls, events):
+        stream = cls()
+        for event in events:
+            stream.append(event.time, event.type, event.data)
+        return stream
+
+    def append(self, time: float, event_type: str, data: str):
+        self.extend([(time, event_type, data)])
+
+    def extend(self, records):
+        """Append (time, type, data) records, a block at a time."""
+        records = list(records)
+        position = 0
+        while position < len(records):
+            room = self.BLOCK - len(self.times) % self.BLOCK
+            chunk = records[position:position + room]
+            position += room
+            times = array('d', [record[0] for record in chunk])
+            # Anything but a one-character ASCII type is stored as 0 and fails validation.
+            codes = bytes([TYPE_CODES.get(record[1], 0) for record in chunk])
+            texts = [record[2] for record in chunk]
+            data = ''.join(texts).encode('utf-8', 'surrogatepass')
+            self.times.extend(times)
+            self.types.extend(codes)
+            self.buffer += data
+            end = self.offsets[-1]
+            self.offsets.extend([end + length for length in accumulate(map(len, texts))])
+            if len(self.times) % self.BLOCK == 0:
+                self.blocks.append(len(self.buffer))
+
+    def _block_text(self, block: int) -> str:
+        end = self.blocks[block + 1] if block + 1 < len(self.blocks) else len(self.buffer)
+        return self.buffer[self.blocks[block]:end].decode('utf-8', 'surrogatepass')
+
+    def data(self, index: int) -> str:
+        first = index - index % self.BLOCK
+        base = self.offsets[first]
+        return self._block_text(index // self.BLOCK)[self.offsets[index] - base:self.offsets[index + 1] - base]
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index: int) -> Event:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return Event(self.times[index], chr(self.types[index]), self.data(index))
+
+    def __iter__(self):
+        for time, event_type, data in self.records():
+            yield Event(time, event_type, data)
+
+    def records(self):
+        """(time, type, data) tuples, without building Event objects."""
+        for records in self.record_blocks():
+            yield from records
+
+    def record_blocks(self):
+        """Lists of up to BLOCK (time, type, data) tuples, in order."""
+        types = [chr(code) for code in range(256)]
+        offsets = self.offsets
+        for block in range(len(self.blocks)):
+            first = block * self.BLOCK
+            last = min(first + self.BLOCK, len(self.times))
+            if first >= last:
+                break
+            text = self._block_text(block)
+            base = offsets[first]
+            yield [(time, types[code], text[start - base:end - base])
+                   for time, code, start, end in zip(self.times[first:last], self.types[first:last],
+                                                     offsets[first:last], offsets[first + 1:last + 1])]
+
+def time_deltas(times):
+    """Gaps between consecutive times."""
+    if numpy is not None:
+        return numpy.diff(numpy.frombuffer(times, dtype=numpy.float64))
+    return array('d', [b - a for a, b in zip(times, times[1:])])
+
+def accumulate_times(start: float, deltas):
+    """Running sum of `deltas` from `start`, in event order."""
+    if numpy is not None:
+        return array('d', numpy.cumsum(numpy.concatenate(([start], deltas))).tobytes())
+    return array('d', accumulate(deltas, initial=start))
+
 class Cast:
-    def __init__(self, header: Header, event_stream: List[Event]):
+    def __init__(self, header: Header, event_stream):
         self.header = header
+        if not isinstance(event_stream, EventStream):
+            event_stream = EventStream.from_events(event_stream)
         self.event_stream = event_stream
 
     @staticmethod
@@ -85,17 +203,23 @@ class Cast:
         return True
 
     @staticmethod
-    def validate_event_stream(event_stream: List[Event], debug):
-        last_time = -1
-        for event in event_stream:
-            if event.time < last_time:
+    def validate_event_stream(event_stream: EventStream, debug):
+        times = event_stream.times
+        if times:
+            if numpy is not None:
+                out_of_order = times[0] < -1 or bool((time_deltas(times) < 0).any())
+            else:
+                out_of_order = times[0] < -1 or any(b < a for a, b in zip(times, times[1:]))
+            if out_of_order:
                 if debug:
                     raise ValidationError("events must be ordered by time")
                 else:
                     return False
-            if not Event.validate(event, debug):
+        if event_stream.types.translate(None, b'io'):
+            if debug:
+                raise ValidationError("type must either be 'o' or 'i'")
+            else:
                 return False
-            last_time = event.time
         return True
 
     @staticmethod
@@ -112,12 +236,13 @@ class Cast:
                 return False
 
         # Use compact encoding for the header
-        header_json = json.dumps(cast.header.__dict__)
-        writer.write(header_json + '\n')
+        cast_writer = castio.CastWriter(writer)
+        cast_writer.write_header(cast.header.__dict__)
 
-        for event in cast.event_stream:
-            json.dump([event.time, event.type, event.data], writer)
-            writer.write('\n')
+        dumpb = castio.dumpb
+        for records in cast.event_stream.record_blocks():
+            cast_writer.write_raw(b'\n'.join([dumpb(record) for record in records]))
+        cast_writer.flush()
         return True
 
     @staticmethod
@@ -128,14 +253,15 @@ class Cast:
             else:
                 return False
 
+        cast_reader = castio.CastReader(reader)
         try:
-            first_line = reader.readline().strip()
+            first_line = cast_reader.header_line
             if not first_line:
                 if debug:
                     raise ValidationError("Header line is empty")
                 else:
                     return False
-            header = json.loads(first_line)
+            header = castio.loads(first_line)
             header_obj = Header(**header)
         except json.JSONDecodeError as e:
             if debug:
@@ -143,20 +269,20 @@ class Cast:
             else:
                 return False
 
-        event_stream = []
-        for line in reader:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                event_data = json.loads(line)
-                event = Event(event_data[0], event_data[1], event_data[2])
-                event_stream.append(event)
-            except json.JSONDecodeError as e:
-                if debug:
-                    raise ValidationError(f"Error decoding event: {e}")
-                else:
-                    return False
+        event_stream = EventStream()
+        records = []
+        try:
+            for raw_event in cast_reader:
+                records.append(raw_event.record)
+                if len(records) == EventStream.BLOCK:
+                    event_stream.extend(records)
+                    records = []
+            event_stream.extend(records)
+        except (json.JSONDecodeError, TypeError, IndexError) as e:
+            if debug:
+                raise ValidationError(f"Error decoding event: {e}")
+            else:
+                return False
 
         cast = Cast(header_obj, event_stream)
         if not Cast.validate(cast, debug):
@@ -174,7 +300,37 @@ class QuantizeRange:
     def range_overlaps(self, another: 'QuantizeRange') -> bool:
         return self.in_range(another.From) or self.in_range(another.To)
 
-class QuantizeTransformation:
+class StreamingTransformation:
+    """Transformation over a stream of (time, type, data) records."""
+
+    name = None
+
+    def stream(self, records):
+        raise NotImplementedError
+
+    def fingerprint(self) -> str:
+        return self.name
+
+    def transform(self, cast: Cast, debug):
+        if not cast:
+            if debug:
+                raise ValidationError("cast must not be nil")
+            else:
+                return False
+        if not cast.event_stream:
+            if debug:
+                raise ValidationError("event stream must not be empty")
+            else:
+                return False
+
+        event_stream = EventStream()
+        event_stream.extend(self.stream(cast.event_stream.records()))
+        cast.event_stream = event_stream
+        return True
+
+class QuantizeTransformation(StreamingTransformation):
+    name = 'quantize'
+
     def __init__(self, ranges: List[QuantizeRange]):
         self.ranges = ranges
 
@@ -195,21 +351,181 @@ class QuantizeTransformation:
             else:
                 return False
 
-        deltas = [0] * len(cast.event_stream)
-        for i in range(len(cast.event_stream) - 1):
-            delta = cast.event_stream[i + 1].time - cast.event_stream[i].time
+        times = cast.event_stream.times
+        deltas = self.quantize(time_deltas(times))
+        cast.event_stream.times = accumulate_times(times[0], deltas)
+        return True
+
+    def fingerprint(self) -> str:
+        return 'quantize ' + ' '.join(f'{q_range.From},{q_range.To}' for q_range in self.ranges)
 
+    def stream(self, records):
+        if not self.ranges:
+            raise ValidationError("at least one quantization range must be specified")
+        last_time = adjusted = None
+        for time, event_type, data in records:
+            adjusted = time if adjusted is None else adjusted + self.quantize_delta(time - last_time)
+            last_time = time
+            yield adjusted, event_type, data
+
+    def quantize_delta(self, delta: float) -> float:
+        for q_range in self.ranges:
+            if q_range.in_range(delta):
+                return q_range.From
+        return delta
+
+    def quantize(self, deltas):
+        """Each delta replaced by the lower bound of the first range holding it."""
+        if numpy is not None:
+            quantized = deltas.copy()
+            pending = numpy.ones(len(deltas), dtype=bool)
             for q_range in self.ranges:
-                if q_range.in_range(delta):
-                    delta = q_range.From
+                hit = pending & (deltas >= q_range.From) & (deltas < q_range.To)
+                quantized[hit] = q_range.From
+                pending &= ~hit
+            return quantized
+
+        ranges = [(q_range.From, q_range.To) for q_range in self.ranges]
+        quantized = array('d', deltas)
+        for i, delta in enumerate(deltas):
+            for from_, to in ranges:
+                if from_ <= delta < to:
+                    quantized[i] = from_
                     break
+        return quantized
 
-            deltas[i] = delta
+class IdleLimitTransformation(StreamingTransformation):
+    """Shortens every pause longer than `limit` seconds to `limit`."""
 
-        for i in range(len(cast.event_stream) - 1):
-            cast.event_stream[i + 1].time = cast.event_stream[i].time + deltas[i]
+    name = 'idle'
 
-        return True
+    def __init__(self, limit: float):
+        self.limit = limit
+
+    def fingerprint(self) -> str:
+        return f'idle {self.limit}'
+
+    def stream(self, records):
+        last_time = adjusted = None
+        for time, event_type, data in records:
+            adjusted = time if adjusted is None else adjusted + min(time - last_time, self.limit)
+            last_time = time
+            yield adjusted, event_type, data
+
+class SpeedTransformation(StreamingTransformation):
+    """Plays the cast `factor` times faster."""
+
+    name = 'speed'
+
+    def __init__(self, factor: float):
+        self.factor = factor
+
+    def fingerprint(self) -> str:
+        return f'speed {self.factor}'
+
+    def stream(self, records):
+        for time, event_type, data in records:
+            yield time / self.factor, event_type, data
+
+class TrimTransformation(StreamingTransformation):
+    """Keeps the events in [start, end); earlier output is kept at time 0."""
+
+    name = 'trim'
+
+    def __init__(self, start: float, end: float = float('inf')):
+        self.start = start
+        self.end = end
+
+    def fingerprint(self) -> str:
+        return f'trim {self.start},{self.end}'
+
+    def stream(self, records):
+        for time, event_type, data in records:
+            if time < self.start:
+                if event_type == 'o':
+                    yield 0.0, event_type, data
+            elif time < self.end:
+                yield time - self.start, event_type, data
+
+class CutTransformation(StreamingTransformation):
+    """Removes the events in [start, end); their output is collapsed to `start`."""
+
+    name = 'cut'
+
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+
+    def fingerprint(self) -> str:
+        return f'cut {self.start},{self.end}'
+
+    def stream(self, records):
+        removed = self.end - self.start
+        for time, event_type, data in records:
+            if time < self.start:
+                yield time, event_type, data
+            elif time >= self.end:
+                yield time - removed, event_type, data
+            elif event_type == 'o':
+                yield self.start, event_type, data
+
+class DropInputTransformation(StreamingTransformation):
+    """Removes input ('i') events, e.g. keystrokes recorded with --stdin."""
+
+    name = 'drop-input'
+
+    def stream(self, records):
+        for record in records:
+            if record[1] != 'i':
+                yield record
+
+class CoalesceTransformation(StreamingTransformation):
+    """Merges consecutive output events within each `window`-second frame."""
+
+    name = 'coalesce'
+
+    def __init__(self, window: float):
+        self.window = window
+
+    def fingerprint(self) -> str:
+        return f'coalesce {self.window}'
+
+    def stream(self, records):
+        pending = []
+        frame = last_time = None
+        for record in records:
+            time, event_type, data = record
+            if event_type == 'o':
+                event_frame = math.ceil(time / self.window)
+                if pending and event_frame != frame:
+                    yield last_time, 'o', ''.join(pending)
+                    pending = []
+                pending.append(data)
+                frame = event_frame
+                last_time = time
+            else:
+                if pending:
+                    yield last_time, 'o', ''.join(pending)
+                    pending = []
+                yield record
+        if pending:
+            yield last_time, 'o', ''.join(pending)
+
+class TransformationChain(StreamingTransformation):
+    """Runs transformations one after another in a single pass."""
+
+    name = 'chain'
+
+    def __init__(self, transformations: List[StreamingTransformation]):
+        self.transformations = list(transformations)
+
+    def fingerprint(self) -> str:
+        return ' | '.join(transformation.fingerprint() for transformation in self.transformations)
+
+    def stream(self, records):
+        for transformation in self.transformations:
+            records = transformation.stream(records)
+        return records
 
 def parse_quantize_range(input: str, debug) -> QuantizeRange:
     parts = input.split(',')
@@ -243,6 +559,57 @@ def parse_quantize_ranges(inputs: List[str], debug) -> List[QuantizeRange]:
             ranges.append(range_)
     return ranges
 
+DEFAULT_COALESCE_WINDOW = 1 / 60
+
+def parse_transformation(spec: str, debug) -> Optional[StreamingTransformation]:
+    """Transformation for a spec such as quantize:0,1, idle:2, speed:2, trim:5,10, cut:5,10,
+    drop-input or coalesce[:SECONDS]."""
+    name, _, argument = spec.strip().partition(':')
+    transformation = None
+    error = None
+    try:
+        if name == 'quantize':
+            ranges = parse_quantize_ranges(argument.split(':'), debug) if argument else []
+            if ranges:
+                transformation = QuantizeTransformation(ranges)
+            else:
+                error = "at least one quantization range must be specified"
+        elif name in ('idle', 'speed', 'coalesce'):
+            value = float(argument) if argument or name != 'coalesce' else DEFAULT_COALESCE_WINDOW
+            if value > 0:
+                transformation = {'idle': IdleLimitTransformation, 'speed': SpeedTransformation,
+                                  'coalesce': CoalesceTransformation}[name](value)
+            else:
+                error = f"constraint not verified: {name} > 0"
+        elif name in ('trim', 'cut'):
+            bounds = [float(part) for part in argument.split(',')]
+            if len(bounds) > 2 or (name == 'cut' and len(bounds) != 2):
+                error = f"invalid range format: must be `{'start,end' if name == 'cut' else 'start[,end]'}`"
+            elif bounds[0] < 0 or (len(bounds) == 2 and bounds[1] <= bounds[0]):
+                error = "constraint not verified: 0 <= start < end"
+            else:
+                transformation = (TrimTransformation if name == 'trim' else CutTransformation)(*bounds)
+        elif name == 'drop-input' and not argument:
+            transformation = DropInputTransformation()
+        else:
+            error = f"unknown transformation `{spec}`"
+    except ValueError:
+        error = f"invalid number in `{spec}`"
+
+    if error:
+        if debug:
+            raise ValidationError(error)
+        else:
+            return None
+    return transformation
+
+def parse_transformations(specs: List[str], debug) -> Optional[TransformationChain]:
+    """A chain of the transformations in `specs`, or None if any is invalid."""
+    transformations = [parse_transformation(spec, debug) for spec in specs]
+    if None in transformations:
+        return None
+    return TransformationChain(transformations)
+
 class Transformer:
     def __init__(self, transformation: QuantizeTransformation, input_file: Optional[str], output_file: Optional[str], debug: bool):
         if not transformation:
@@ -260,7 +627,7 @@ class Transformer:
         try:
             if self.debug:
                 print(f"Reading file: {self.input_file}")
-            with open(self.input_file, 'r') as infile:
+            with open(self.input_file, 'rb') as infile:
                 cast = Cast.decode(infile, self.debug)
                 if not cast:
                     return
@@ -269,45 +636,217 @@ class Transformer:
             
             if self.debug:
                 print(f"Writing file: {self.output_file}")
-            with open(self.output_file, 'w') as outfile:
+            with open(self.output_file, 'wb') as outfile:
                 Cast.encode(outfile, cast, self.debug)
         except Exception as e:
             if self.debug:
                 raise ValidationError(f"Error processing file {self.input_file}: {e}")
 
-def quantize_action(script_dir: str, debug: bool):
-    input_dir = os.path.join(script_dir, 'static', 'splits')
-    if debug:
-        print(f"Input directory: {input_dir}")
-    
-    default_range = ["2"]
-    quantize_ranges = parse_quantize_ranges(default_range, debug)
-    transformation = QuantizeTransformation(quantize_ranges)
+class StreamingTransformer(Transformer):
+    """Transformer that streams events through the transformation to a temp file."""
 
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".cast"):
-            input_path = os.path.join(input_dir, filename)
-            output_path = input_path
+    def transform(self):
+        try:
+            if self.debug:
+                print(f"Streaming file: {self.input_file} -> {self.output_file}")
+            with castio.CastReader(self.input_file) as reader, \
+                    castio.CastWriter(self.output_file, atomic=True) as writer:
+                self._stream(reader, writer)
+            return True
+        except ValidationError:
+            if self.debug:
+                raise
+            return False
+        except Exception as e:
+            if self.debug:
+                raise ValidationError(f"Error processing file {self.input_file}: {e}")
+            return False
 
-            if debug:
-                print(f"Processing file: {input_path}")
+    def _stream(self, reader, writer):
+        try:
+            header = Header(**castio.loads(reader.header_line)) if reader.header_line else None
+        except (ValueError, TypeError) as e:
+            raise ValidationError(f"Error decoding header: {e}")
+        Header.validate(header, True)
+        writer.write_header(header.__dict__)
+        for record in self.transformation.stream(self._records(reader)):
+            writer.write(record)
+
+    @staticmethod
+    def _records(reader):
+        """Validated (time, type, data) records of `reader`."""
+        last_time = -1
+        count = 0
+        for event in reader:
             try:
-                transformer = Transformer(transformation, input_path, output_path, debug)
-                transformer.transform()
-            except ValidationError as e:
-                print(f"ValidationError processing file {input_path}: {e}")
+                record = event.record
+                time, event_type, data = float(record[0]), record[1], record[2]
+            except (ValueError, TypeError, IndexError) as e:
+                raise ValidationError(f"Error decoding event: {e}")
+            if time < last_time:
+                raise ValidationError("events must be ordered by time")
+            if event_type not in ("i", "o"):
+                raise ValidationError("type must either be 'o' or 'i'")
+            last_time = time
+            count += 1
+            yield time, event_type, data
+        if not count:
+            raise ValidationError("event stream must not be empty")
+
+DEFAULT_TRANSFORMS = ["quantize:2"]
+
+def transform_lines(transformation: StreamingTransformation, lines):
+    """Header and event lines of a cast, with the events passed through `transformation`."""
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None:
+        return
+    yield header
+    records = (castio.loads(line) for line in lines)
+    for record in transformation.stream((float(record[0]), record[1], record[2]) for record in records):
+        yield castio.dumpb(list(record))
+
+def cast_stats(path: str):
+    """(bytes, events, seconds to decode every event) of a cast."""
+    start = perf_counter()
+    with castio.CastReader(path) as reader:
+        events = sum(1 for _ in reader.records())
+    return os.path.getsize(path), events, perf_counter() - start
+
+def _transform_task(transformation: StreamingTransformation, path: str, debug: bool, report: bool = False):
+    """(size, mtime_ns, stats) of one split transformed in place, or None if rejected."""
+    before = cast_stats(path) if report else None
+    if not StreamingTransformer(transformation, path, path, debug).transform():
+        return None
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, (before, cast_stats(path)) if report else None
+
+def transform_files(transformation: StreamingTransformation, paths: List[str], debug: bool, jobs: int = 1,
+                    report: bool = False):
+    """Transform each path in place, yielding (path, _transform_task result or exception)."""
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, _transform_task(transformation, path, debug, report)
             except Exception as e:
-                print(f"Unexpected error processing file {input_path}: {e}")
+                yield path, e
+        return
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Quantize Asciinema Casts in a directory.')
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_transform_task, transformation, path, debug, report) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                yield path, future.result()
+            except Exception as e:
+                yield path, e
+
+def format_report(name: str, before, after) -> str:
+    (size, events, seconds), (new_size, new_events, new_seconds) = before, after
+    saved = 1 - new_size / size if size else 0
+    return (f"{name}: {size:,} -> {new_size:,} bytes (-{saved:.0%}), {events:,} -> {new_events:,} events, "
+            f"parse {seconds * 1000:.1f} -> {new_seconds * 1000:.1f} ms")
+
+def transform_paths(transformation: StreamingTransformation, paths: List[str], debug: bool, jobs: int = 1,
+                    report: bool = False):
+    """Transform each path in place, yielding (path, size, mtime_ns) per file rewritten."""
+    totals = [[0, 0, 0.0], [0, 0, 0.0]]
+    for input_path, result in transform_files(transformation, paths, debug, jobs, report):
+        if debug:
+            print(f"Processed file: {input_path}")
+        if isinstance(result, ValidationError):
+            print(f"ValidationError processing file {input_path}: {result}")
+        elif isinstance(result, Exception):
+            print(f"Unexpected error processing file {input_path}: {result}")
+        elif result is not None:
+            size, mtime_ns, stats = result
+            if stats:
+                print(format_report(os.path.basename(input_path), *stats))
+                for total, stat in zip(totals, stats):
+                    total[:] = [a + b for a, b in zip(total, stat)]
+            yield input_path, size, mtime_ns
+    if report and totals[0][1]:
+        print(format_report("Total", *totals))
+
+def transformation_steps(transformation: StreamingTransformation) -> List[StreamingTransformation]:
+    if isinstance(transformation, TransformationChain):
+        return [step for inner in transformation.transformations for step in transformation_steps(inner)]
+    return [transformation]
+
+def applied_steps(entry, stat) -> List[str]:
+    """Fingerprints of the steps already applied to a split, from its catalog entry.
+
+    A step is never applied twice: speed, trim and cut would compound.
+    """
+    if entry is None or entry[:2] != (stat.st_size, stat.st_mtime_ns):
+        return []
+    return entry[2].split(' | ')
+
+def quantize_action(script_dir: str, debug: bool, jobs: int = 1,
+                    transformation: Optional[StreamingTransformation] = None, report: bool = False):
+    """Transform the splits that changed since the catalog last saw them transformed."""
+    input_dir = os.path.join(script_dir, 'static', 'splits')
+    if debug:
+        print(f"Input directory: {input_dir}")
+    
+    if transformation is None:
+        transformation = parse_transformations(DEFAULT_TRANSFORMS, debug)
+
+    split_catalog = catalog.open_catalog(input_dir)
+    try:
+        done = split_catalog.quantized()
+        pending = {}
+        for entry in os.scandir(input_dir):
+            if entry.name.endswith(".cast") and entry.is_file():
+                applied = applied_steps(done.get(entry.name), entry.stat())
+                steps = [step for step in transformation_steps(transformation) if step.fingerprint() not in applied]
+                if steps:
+                    pending.setdefault(tuple(step.fingerprint() for step in steps), (steps, []))[1].append(
+                        (entry.path, applied))
+        if debug:
+            print(f"Transforming {sum(len(paths) for _, paths in pending.values())} new or changed splits: "
+                  f"{transformation.fingerprint()}")
+
+        for fingerprints, (steps, paths) in pending.items():
+            applied = dict(paths)
+            split_catalog.record_quantized([
+                (os.path.basename(path), size, mtime_ns, ' | '.join(applied[path] + list(fingerprints)))
+                for path, size, mtime_ns in transform_paths(TransformationChain(steps), sorted(applied), debug,
+                                                            jobs, report)])
+    finally:
+        split_catalog.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize or otherwise re-time Asciinema casts in place.')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Number of splits to quantize in parallel (default 0 uses every core).')
+    parser.add_argument('-t', '--transform', action='append', metavar='SPEC',
+                        help='Transformation to apply, repeatable and run in order: quantize:RANGE[:RANGE...], '
+                             'idle:SECONDS, speed:FACTOR, trim:START[,END], cut:START,END, drop-input or '
+                             'coalesce[:SECONDS] '
+                             f"(default {' '.join(DEFAULT_TRANSFORMS)}).")
+    parser.add_argument('--report', action='store_true',
+                        help="Print each file's size, event count and parse time before and after.")
+    parser.add_argument('files', nargs='*',
+                        help='Casts to transform in place instead of the new splits in static/splits.')
     args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    try:
+        transformation = parse_transformations(args.transform or DEFAULT_TRANSFORMS, True)
+    except ValidationError as e:
+        parser.error(str(e))
 
     script_dir = os.path.dirname(os.path.realpath(__file__))
     try:
-        quantize_action(script_dir, args.debug)
+        if args.files:
+            for _ in transform_paths(transformation, args.files, args.debug, jobs, args.report):
+                pass
+        else:
+            quantize_action(script_dir, args.debug, jobs, transformation, args.report)
     except ValidationError as e:
         print(f"Error: {e}")
     except Exception as e:
         print(f"Unexpected error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import re
+
+# Prompt profiles tell split.py where one command ends and the next begins.
+#
+#   title   bytes regex over a raw event line that always accompanies a new
+#           prompt, e.g. the OSC window title most shells set from PS1.
+#           A match is a boundary without looking at the screen.
+#   hint    bytes regex over a raw event line that may print the prompt. A
+#           match is only a candidate: the screen is rendered and the
+#           boundary confirmed by `prompt` matching the cursor row.
+#   prompt  regex over one rendered screen line; whatever follows the last
+#           match is the command typed at that prompt.
+
+# Title set by the default Kali, Debian and Ubuntu PS1: "\e]0;user@host: dir\a".
+USER_HOST_TITLE = rb';[\w,\d,-,_,\.]+@[\w,-.\d]+:'
+
+
+class PromptProfile:
+    def __init__(self, name, prompt, title=None, hint=None):
+        self.name = name
+        self.prompt = prompt
+        self.title = title
+        self.hint = hint
+
+    def __repr__(self):
+        return f"PromptProfile({self.name!r})"
+
+
+PROFILES = {
+    'kali': PromptProfile('kali', r'└─\$', title=USER_HOST_TITLE),
+    'ohmyzsh': PromptProfile('ohmyzsh', r'➜', title=USER_HOST_TITLE),
+    'bash': PromptProfile('bash', r'[\w.-]+@[\w.-]+:[^\s$#]*[$#] ', title=USER_HOST_TITLE, hint=rb'[$#] '),
+    'fish': PromptProfile('fish', r'[\w.-]+@[\w.-]+ [^\s>]*> ', hint=rb'> '),
+}
+
+DEFAULT_PROFILES = ('kali', 'ohmyzsh')
+
+
+def custom_profile(prompt, name='custom'):
+    """Profile for a user-supplied PS1 regex, confirmed on screen after any
+    event that ends in a usual prompt character."""
+    re.compile(prompt)
+    return PromptProfile(name, prompt, title=USER_HOST_TITLE, hint=rb'[$#%>] ')
+
+
+def resolve_profiles(names=None, custom_prompts=()):
+    """Profiles for the given names (default: kali and oh-my-zsh) plus one per
+    custom prompt regex. Unknown names raise ValueError."""
+    profiles = []
+    for name in names or DEFAULT_PROFILES:
+        if name not in PROFILES:
+            raise ValueError(f"Unknown prompt profile '{name}' (known: {', '.join(sorted(PROFILES))})")
+        profiles.append(PROFILES[name])
+    for index, prompt in enumerate(custom_prompts):
+        profiles.append(custom_profile(prompt, f'custom{index}'))
+    return profiles
+
+
+def _combine(patterns):
+    patterns = list(dict.fromkeys(p for p in patterns if p))
+    if not patterns:
+        return None
+    if len(patterns) == 1:
+        return re.compile(patterns[0])
+    if isinstance(patterns[0], bytes):
+        return re.compile(b'|'.join(b'(?:' + p + b')' for p in patterns))
+    return re.compile('|'.join(f'(?:{p})' for p in patterns))
+
+
+def normalize_command(command):
+    command = command.strip()
+    parts = command.split()
+    if parts and parts[0].startswith(('python3', 'sudo')):
+        return " ".join(parts[1:]).replace(' ', '_')
+    return command.replace(' ', '_')
+
+
+class PromptScanner:
+    """The title, hint and prompt patterns of several profiles, each compiled
+    into a single alternation so an event is scanned once per kind."""
+
+    def __init__(self, profiles=None):
+        self.profiles = list(profiles) if profiles is not None else resolve_profiles()
+        self.title = _combine(p.title for p in self.profiles)
+        self.hint = _combine(p.hint for p in self.profiles)
+        self.prompt = _combine(p.prompt for p in self.profiles)
+
+    def is_title(self, raw):
+        return self.title is not None and self.title.search(raw) is not None
+
+    def is_hint(self, raw):
+        return self.hint is not None and self.hint.search(raw) is not None
+
+    def has_prompt(self, line):
+        return self.prompt is not None and self.prompt.search(line) is not None
+
+    def prompt_end(self, line):
+        """Column just past the last prompt on `line`, or None."""
+        end = None
+        if self.prompt is not None:
+            for match in self.prompt.finditer(line):
+                end = match.end()
+        return end
+
+    def command(self, line):
+        """The command typed after the last prompt on `line`, or None."""
+        end = self.prompt_end(line)
+        if end is None:
+            return None
+        return normalize_command(line[end:])
@@ -3,86 +3,926 @@ import re
 import sys
 import os
 import argparse
+import castio
+import base64
+import binascii
+import contextlib
+import functools
+import hashlib
+import math
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
 
-def extract_ansi_and_text(text):
-    ansi_escape = re.compile(r'(\x1b\[[0-9;]*[mKDHCUJ])')
-    parts = ansi_escape.split(text)
-    ansi_positions = []
-    clean_text = ""
-    last_pos = 0
-
-    for part in parts:
-        if ansi_escape.match(part):
-            ansi_positions.append((last_pos, part))
-        else:
-            clean_text += part
-            last_pos += len(part)
-
-    return clean_text, ansi_positions
-
-def reinsert_ansi_codes(text, ansi_positions):
-    for pos, code in reversed(ansi_positions):
-        text = text[:pos] + code + text[pos:]
-    return text
-
-def redact_sensitive_info(text, redaction_word=None):
-    clean_text, ansi_positions = extract_ansi_and_text(text)
-    patterns = [
-        (r'(?<=-H\s)["\']?\S+["\']?', lambda m: '*' * len(m.group())),
-        (r'(?<=-p\s)["\']?\S+["\']?', lambda m: '*' * len(m.group())),
-        (r'\b[a-fA-F0-9]{32}:[a-fA-F0-9]{32}\b', lambda m: '*' * len(m.group()))
-    ]
-    if redaction_word:
-        patterns.append((re.escape(redaction_word), '*' * len(redaction_word)))
-    for pattern, repl in patterns:
-        clean_text = re.sub(pattern, repl, clean_text)
-    return reinsert_ansi_codes(clean_text, ansi_positions)
-
-def process_cast_file(input_file_path, output_file_path, redaction_word=None, force=False):
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MANIFEST_NAME = '.redact_manifest.json'
+INDEX_NAME = '.redaction_index.json'
+WORDS_FILE_NAME = 'redaction_words.txt'
+FOLLOW_STATE_NAME = '.follow_state.json'
+FOLLOW_READ_BYTES = 1 << 20
+BLOOM_HASHES = 7
+
+# CSI codes, and the OSC 133 markers configure.sh adds around every command
+# (including one cut off at the end of the text, so its payload is not scanned).
+ANSI_ESCAPE = re.compile(r'(\x1b\[[0-9;]*[mKDHCUJ]|\x1b\]133;[^\x07\x1b]*(?:\x07|\x1b\\|\Z))')
+COMMAND_MARKER = '\x1b]133;C;'
+COMMAND_PAYLOAD = re.compile(r'\x1b\]133;C;([^;\x07\x1b]*)(.*)', re.S)
+
+BUILTIN_RULES = [
+    ('header', r'(?<=-H\s)["\']?\S+["\']?'),
+    ('password', r'(?<=-p\s)["\']?\S+["\']?'),
+    ('ntlm', r'\b[a-fA-F0-9]{32}:[a-fA-F0-9]{32}\b'),
+]
+
+class EntropyDetector:
+    """Flags long tokens shaped like keys, tickets or encoded blobs.
+
+    Candidates come from a single regex pass; only tokens of at least
+    `min_length` characters are scored. Dotted, slashed or dashed names made
+    of short segments (paths, hostnames, versions) are never flagged. Hex
+    tokens need 32+ characters and `hex_threshold` bits of entropy; other
+    tokens need a letter and a digit and entropy close to the maximum for
+    their length, capped at `threshold` bits.
+    """
+
+    SEPARATORS = re.compile(r'[-./]')
+    HEX = re.compile(r'[0-9a-fA-F]+')
+
+    def __init__(self, min_length=20, threshold=4.5, hex_threshold=3.0):
+        self.min_length = min_length
+        self.threshold = threshold
+        self.hex_threshold = hex_threshold
+        self.pattern = re.compile(r'(?<![A-Za-z0-9+/=_.\-])[A-Za-z0-9+/=_.\-]{%d,}' % min_length)
+
+    def describe(self):
+        return ['entropy', self.min_length, self.threshold, self.hex_threshold]
+
+    def spans(self, text):
+        spans = []
+        if len(text) < self.min_length:
+            return spans
+        for match in self.pattern.finditer(text):
+            token = match.group()
+            start = match.start() + len(token) - len(token.lstrip('.-/'))
+            token = token.strip('.-/')
+            # In key=value pairs only the value is scored; '=' is otherwise base64 padding.
+            key_end = token.rstrip('=').rfind('=') + 1
+            start += key_end
+            token = token[key_end:]
+            if self.is_secret(token):
+                spans.append((start, start + len(token)))
+        return spans
+
+    def is_secret(self, token):
+        length = len(token)
+        if length < self.min_length:
+            return False
+        segments = self.SEPARATORS.split(token)
+        if len(segments) >= 3 and max(map(len, segments)) <= 12:
+            return False
+        if self.HEX.fullmatch(token):
+            return length >= 32 and shannon_entropy(token) >= self.hex_threshold
+        if token.isalpha() or not any(c.isalpha() for c in token) or not any(c.isdigit() for c in token):
+            return False
+        return shannon_entropy(token) >= min(self.threshold, 0.85 * math.log2(length))
+
+def shannon_entropy(text):
+    length = len(text)
+    return -sum(count / length * math.log2(count / length) for count in Counter(text).values())
+
+class Redactor:
+    """Redaction rules, each matched on its own so one rule's match never hides another's.
+
+    Words share one alternation (longest first) searched at every match
+    start, so overlapping words are all found. Every match is masked with
+    '*' of the same length, so redaction never changes the length of the
+    text it is applied to. Optional detectors (see EntropyDetector) run as
+    a further scan over the same text.
+    """
+
+    def __init__(self, rules=None, words=None, detectors=None):
+        self.rules = list(BUILTIN_RULES if rules is None else rules)
+        words = [word for word in (words or ()) if word]
+        self.rules.extend(('word', re.escape(word)) for word in words)
+        self.max_word_length = max(map(len, words), default=0)
+        self.detectors = list(detectors or ())
+        identity = self.rules + [detector.describe() for detector in self.detectors]
+        self.fingerprint = hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+        self.patterns = [re.compile(pattern) for kind, pattern in self.rules if kind != 'word']
+        literals = sorted((pattern for kind, pattern in self.rules if kind == 'word'), key=len, reverse=True)
+        self.words = re.compile('|'.join(literals)) if literals else None
+
+    def spans(self, text):
+        spans = [match.span() for pattern in self.patterns for match in pattern.finditer(text)]
+        if self.words:
+            match = self.words.search(text)
+            while match:
+                spans.append(match.span())
+                match = self.words.search(text, match.start() + 1)
+        for detector in self.detectors:
+            spans.extend(detector.spans(text))
+        spans.sort()
+        return spans
+
+    def redact(self, text):
+        if '\x1b' not in text:
+            spans = self.spans(text)
+            return mask_spans(text, spans) if spans else text
+
+        # Rules are matched against the text with escape codes removed, then the
+        # mask is laid back over the original so the codes are left untouched.
+        parts = ANSI_ESCAPE.split(text)
+        clean_text = ''.join(parts[::2])
+        spans = self.spans(clean_text)
+        if not spans and COMMAND_MARKER not in text:
+            return text
+        masked = mask_spans(clean_text, spans) if spans else clean_text
+        output = []
+        pos = 0
+        for index, part in enumerate(parts):
+            if index & 1:
+                output.append(self.redact_marker(part) if part.startswith(COMMAND_MARKER) else part)
+            elif part:
+                output.append(masked[pos:pos + len(part)])
+                pos += len(part)
+        output = ''.join(output)
+        return text if output == text else output
+
+    def redact_marker(self, marker):
+        """A 133;C marker with its base64 command line redacted, at the same length."""
+        rest = COMMAND_PAYLOAD.match(marker).group(2)
+        command = marker_command(marker)
+        if command is None or not marker.endswith(('\x07', '\x1b\\')):
+            return marker
+        masked = self.redact(command)
+        if masked == command:
+            return marker
+        # Mask byte for byte so the payload, and so the event, keeps its length.
+        data = b''.join(b'*' * len(old.encode('utf-8', 'surrogateescape')) if new == '*' and old != '*'
+                        else old.encode('utf-8', 'surrogateescape') for old, new in zip(command, masked))
+        return COMMAND_MARKER + base64.b64encode(data).decode('ascii') + rest
+
+def marker_command(marker):
+    try:
+        return base64.b64decode(COMMAND_PAYLOAD.match(marker).group(1), validate=True).decode('utf-8', 'surrogateescape')
+    except (binascii.Error, ValueError):
+        return None
+
+def mask_spans(text, spans):
+    output = []
+    last = 0
+    for start, end in spans:
+        if end <= last:
+            continue
+        start = max(start, last)
+        output.append(text[last:start])
+        output.append('*' * (end - start))
+        last = end
+    output.append(text[last:])
+    return ''.join(output)
+
+@functools.lru_cache(maxsize=32)
+def get_redactor(redaction_word=None):
+    return Redactor(words=[redaction_word] if redaction_word else None)
+
+def redact_sensitive_info(text, redaction_word=None, redactor=None):
+    if redactor is None:
+        redactor = get_redactor(redaction_word)
+    return redactor.redact(text)
+
+class StreamingRedactor:
+    """Redacts consecutive cast events with a bounded carry-over window.
+
+    Output events are held back until at least `window` characters of later
+    output have been seen, so a secret flushed across two 'o' events is
+    matched as a whole. Events are released in order with their original
+    timestamps; memory is bounded by the window plus the largest event.
+
+    Only the tail that can still change is rescanned on each event: from the
+    start of the last whitespace-delimited token (plus room for the rules'
+    lookbehind and the longest literal word), never more than `window` back.
+    """
+
+    LOOKBEHIND = 3
+
+    def __init__(self, redactor, window=256, max_pending=512):
+        self.redactor = redactor
+        self.window = window
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._pending_chars = 0
+        self._text = ''
+        self._origin = 0
+        self.redacted = 0
+
+    def feed(self, record):
+        if not (isinstance(record, list) and len(record) > 2 and record[1] == 'o'):
+            if not self._pending:
+                return [record]
+            self._pending.append((record, None, 0))
+            return self._release()
+
+        text = record[2]
+        end = len(self._text)
+        self._pending.append((record, text, self._origin + end))
+        self._pending_chars += len(text)
+        restart = self._restart_offset(end)
+        self._text += text
+        self._redact_tail(restart)
+        return self._release()
+
+    def set_redactor(self, redactor):
+        """Switch to `redactor` and apply it to the events still held back."""
+        self.redactor = redactor
+        self._redact_tail(0)
+
+    def flush(self):
+        released = [record for record, _, _ in self._pending]
+        self._pending.clear()
+        self._pending_chars = 0
+        self._origin += len(self._text)
+        self._text = ''
+        return released
+
+    def _restart_offset(self, end):
+        text = self._text
+        floor = max(0, end - self.window)
+        token_start = max(text.rfind(' ', floor, end), text.rfind('\n', floor, end),
+                          text.rfind('\r', floor, end), text.rfind('\t', floor, end)) + 1
+        restart = min(token_start - self.LOOKBEHIND, end - self.redactor.max_word_length)
+        restart = max(restart, floor)
+        # Never start inside an escape sequence, or its tail would be scanned as text.
+        escape = text.rfind('\x1b', max(floor, restart - 16), restart)
+        return escape if escape != -1 else restart
+
+    def _redact_tail(self, restart):
+        tail = self._text[restart:]
+        masked = self.redactor.redact(tail)
+        if masked is tail:
+            return
+        tail_start = self._origin + restart
+        for record, text, start in self._pending:
+            if text is None or start + len(text) <= tail_start:
+                continue
+            offset = start - tail_start
+            if offset < 0:
+                redacted = record[2][:-offset] + masked[:len(text) + offset]
+            else:
+                redacted = masked[offset:offset + len(text)]
+            if redacted == record[2]:
+                continue
+            self.redacted += 1
+            if record[2] == text:
+                record[2] = redacted
+            else:
+                # A mask from an earlier pass is never lifted by later context.
+                record[2] = ''.join(old if new == original else new
+                                    for old, new, original in zip(record[2], redacted, text))
+
+    def _release(self):
+        released = []
+        while self._pending:
+            record, text, _ = self._pending[0]
+            size = len(text) if text is not None else 0
+            if self._pending_chars - size < self.window and len(self._pending) <= self.max_pending:
+                break
+            self._pending.popleft()
+            self._pending_chars -= size
+            released.append(record)
+        # Keep one window of already-released text as lookbehind context.
+        excess = len(self._text) - self._pending_chars - self.window
+        if excess > self.window:
+            self._text = self._text[excess:]
+            self._origin += excess
+        return released
+
+def process_cast_file(input_file_path, output_file_path, redaction_word=None, force=False, redactor=None,
+                      keep_unchanged=False):
     if os.path.exists(output_file_path) and not force:
         print(f"Skipping already processed file: {output_file_path}")
-        return
-    temp_file_path = input_file_path + '.tmp'
+        return 0
+    if redactor is None:
+        redactor = get_redactor(redaction_word)
+    # The writer's temp file lives next to the output so the final os.replace is atomic.
+    writer = castio.CastWriter(output_file_path, atomic=True)
     try:
-        with open(input_file_path, 'r') as file, open(temp_file_path, 'w') as temp_out:
-            for line in file:
+        with castio.CastReader(input_file_path) as reader:
+            if reader.header_line:
+                writer.write_raw(reader.header_line)
+            streamer = StreamingRedactor(redactor)
+            fed = deque()
+
+            def write_released(records):
+                for record in records:
+                    event, data = fed.popleft()
+                    # Events the redactor left alone are copied through byte for byte.
+                    writer.write_event(event, None if data is None or record[2] is data else record)
+
+            for event in reader:
                 try:
-                    record = json.loads(line)
-                    if isinstance(record, list) and len(record) > 2 and record[1] == 'o':
-                        record[2] = redact_sensitive_info(record[2], redaction_word)
-                    json.dump(record, temp_out)
-                    temp_out.write('\n')
-                except json.JSONDecodeError as e:
-                    print(f"Error processing line: {line.strip()} - {e}")
-        os.replace(temp_file_path, output_file_path)
+                    record = event.record
+                except ValueError as e:
+                    print(f"Error processing line: {event.raw.decode('utf-8', 'replace')} - {e}")
+                    continue
+                fed.append((event, record[2] if event.is_output() else None))
+                write_released(streamer.feed(record))
+            write_released(streamer.flush())
+    except BaseException:
+        writer.discard()
+        raise
+    # Leave an untouched file (and its mtime) alone when nothing was redacted.
+    if keep_unchanged and streamer.redacted == 0 and os.path.exists(output_file_path):
+        writer.discard()
+    else:
+        writer.close()
+    return streamer.redacted
+
+_worker_redactor = None
+
+def _init_worker(redactor):
+    global _worker_redactor
+    _worker_redactor = redactor
+
+def _redact_task(task):
+    input_file_path, output_file_path = task
+    stat = os.stat(input_file_path)
+    digest = file_digest(input_file_path)
+    process_cast_file(input_file_path, output_file_path, force=True, redactor=_worker_redactor)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest,
+            "rules": _worker_redactor.fingerprint}
+
+def redact_text_file(file_path, redactor, keep_unchanged=True):
+    with open(file_path, 'r') as f:
+        content = f.read()
+    redacted = redactor.redact(content)
+    if redacted is content and keep_unchanged:
+        return 0
+    f, temp_file_path = castio.temp_file(file_path, 'w')
+    try:
+        with f:
+            f.write(redacted)
+        os.replace(temp_file_path, file_path)
     finally:
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
+    return 1 if redacted is not content else 0
+
+def _redact_in_place_task(file_path):
+    if file_path.endswith('.txt'):
+        return redact_text_file(file_path, _worker_redactor)
+    return process_cast_file(file_path, file_path, force=True, redactor=_worker_redactor, keep_unchanged=True)
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest_path, manifest):
+    f, temp_path = castio.temp_file(manifest_path, 'w')
+    try:
+        with f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+@contextlib.contextmanager
+def manifest_lock(manifest_path):
+    """Hold an exclusive lock on `manifest_path` across a load, change and save.
+
+    The batch stage, the --follow daemon and add_redaction_word all rewrite the
+    manifest; without the lock one of them can save over another's entries.
+    """
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    with open(f"{manifest_path}.lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def is_current(entry, input_file_path, output_file_path, fingerprint):
+    if not entry or entry.get("rules") != fingerprint or not os.path.exists(output_file_path):
+        return False
+    stat = os.stat(input_file_path)
+    if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    # Touched but possibly unchanged: only then is the content hash worth reading.
+    if entry.get("size") != stat.st_size or file_digest(input_file_path) != entry.get("sha256"):
+        return False
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+def collect_tasks(full_dir, redacted_dir, manifest, fingerprint):
+    tasks = []
+    seen = set()
+    for root, dirs, files in os.walk(full_dir):
+        for file in files:
+            if file.endswith('.cast'):
+                input_file_path = os.path.join(root, file)
+                relative_path = os.path.relpath(input_file_path, full_dir)
+                output_file_path = os.path.join(redacted_dir, relative_path)
+                seen.add(relative_path)
+                if not is_current(manifest.get(relative_path), input_file_path, output_file_path, fingerprint):
+                    tasks.append((input_file_path, output_file_path))
+    for relative_path in set(manifest) - seen:
+        del manifest[relative_path]
+    return sorted(tasks)
+
+def redact_files(tasks, redactor, jobs=1, task_function=_redact_task, progress=None, desc="Redacting Files",
+                 mp_context=None):
+    results = {}
+    failed = []
+    total = len(tasks)
+    if jobs <= 1 or total <= 1:
+        _init_worker(redactor)
+        for task in tqdm(tasks, desc=desc, disable=progress is not None):
+            try:
+                results[task] = task_function(task)
+            except Exception as e:
+                failed.append((task, e))
+            if progress:
+                progress(len(results) + len(failed), total)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=_init_worker,
+                                 initargs=(redactor,)) as executor:
+            futures = {executor.submit(task_function, task): task for task in tasks}
+            for future in tqdm(as_completed(futures), total=total, desc=f"{desc} ({jobs} jobs)",
+                               disable=progress is not None):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    failed.append((futures[future], e))
+                if progress:
+                    progress(len(results) + len(failed), total)
+
+    failed.sort(key=lambda item: item[0])
+    for task, e in failed:
+        print(f"Error redacting {task[0] if isinstance(task, tuple) else task}: {e}")
+    return results, failed
+
+def redact_file(file_path, word):
+    """Redact `word` (and the built-in rules) from a single split in place."""
+    return process_cast_file(file_path, file_path, force=True, redactor=get_redactor(word), keep_unchanged=True)
+
+def collect_word_targets(static_dir):
+    targets = []
+    for subdir, extension in (('splits', '.cast'), ('redacted_full', '.cast'), ('text', '.txt')):
+        directory = os.path.join(static_dir, subdir)
+        if os.path.isdir(directory):
+            targets.extend(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(extension))
+    return sorted(targets)
+
+def file_mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+def load_redaction_words(words_path):
+    words = []
+    if os.path.exists(words_path):
+        with open(words_path, 'r') as f:
+            for line in f:
+                word = line.rstrip('\n')
+                if word and word not in words:
+                    words.append(word)
+    return words
+
+def save_redaction_word(words_path, word):
+    words = load_redaction_words(words_path)
+    if word in words:
+        return False
+    with open(words_path, 'a') as f:
+        f.write(word + '\n')
+    return True
+
+def _bloom_positions(gram, bits):
+    digest = hashlib.blake2b(gram.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    h1 = int.from_bytes(digest[:4], 'little')
+    h2 = int.from_bytes(digest[4:], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(BLOOM_HASHES)]
+
+def _trigrams(text):
+    return set(map(''.join, zip(text, text[1:], text[2:])))
+
+def _file_trigrams(file_path):
+    if file_path.endswith('.txt'):
+        with open(file_path, 'r') as f:
+            return _trigrams(f.read())
+    grams = set()
+    with castio.CastReader(file_path) as reader:
+        carry = ''
+        for record in reader.records():
+            if isinstance(record, list) and len(record) > 2 and record[1] == 'o':
+                # Carry two characters so grams spanning an event boundary are indexed.
+                text = carry + ANSI_ESCAPE.sub('', record[2])
+                grams.update(_trigrams(text))
+                for marker in ANSI_ESCAPE.findall(record[2]):
+                    if marker.startswith(COMMAND_MARKER):
+                        grams.update(_trigrams(marker_command(marker) or ''))
+                carry = text[-2:]
+    return grams
+
+def _index_task(file_path):
+    stat = os.stat(file_path)
+    grams = _file_trigrams(file_path)
+    bits = 8192
+    while bits < len(grams) * 10:
+        bits <<= 1
+    bloom = bytearray(bits // 8)
+    for gram in grams:
+        for bit in _bloom_positions(gram, bits):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "bits": bits,
+            "bloom": base64.b64encode(bytes(bloom)).decode('ascii')}
+
+class RedactionIndex:
+    """Per-file Bloom filters over the character trigrams of each file's output text.
+
+    A word can only occur in a file whose filter holds all of the word's
+    trigrams, so adding a word only has to rewrite those candidates. Entries
+    are rebuilt lazily for files whose size or mtime changed.
+    """
+
+    def __init__(self, index_path, static_dir):
+        self.index_path = index_path
+        self.static_dir = static_dir
+        self.entries = load_manifest(index_path)
+
+    def _key(self, file_path):
+        return os.path.relpath(file_path, self.static_dir)
+
+    def refresh(self, file_paths, jobs=1, progress=None, mp_context=None):
+        stale = []
+        for file_path in file_paths:
+            entry = self.entries.get(self._key(file_path))
+            stat = os.stat(file_path)
+            if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                stale.append(file_path)
+        if stale:
+            results, _ = redact_files(stale, None, jobs, task_function=_index_task, progress=progress,
+                                      desc="Indexing Files", mp_context=mp_context)
+            for file_path, entry in results.items():
+                self.entries[self._key(file_path)] = entry
+        live = {self._key(file_path) for file_path in file_paths}
+        for key in set(self.entries) - live:
+            del self.entries[key]
+        save_manifest(self.index_path, self.entries)
+
+    def candidates(self, word, file_paths):
+        grams = _trigrams(word)
+        if not grams:
+            return list(file_paths)
+        matches = []
+        for file_path in file_paths:
+            entry = self.entries.get(self._key(file_path))
+            if entry is None:
+                matches.append(file_path)
+                continue
+            bloom = base64.b64decode(entry["bloom"])
+            if all(bloom[bit >> 3] & (1 << (bit & 7))
+                   for gram in grams for bit in _bloom_positions(gram, entry["bits"])):
+                matches.append(file_path)
+        return matches
+
+def redact_word_everywhere(word, static_dir, jobs=None, progress=None, targets=None, mp_context=None):
+    """Redact `word` from every split, redacted recording and text transcript.
+
+    Candidate files are found through the trigram index, so only files that
+    can contain the word are read and rewritten. Returns the list of files
+    that were rewritten and the list of failures. Callers running in a
+    thread pass a forkserver or spawn `mp_context` for the process pool.
+    """
+    if targets is None:
+        targets = collect_word_targets(static_dir)
+    jobs = jobs or os.cpu_count() or 1
+    index = RedactionIndex(os.path.join(static_dir, INDEX_NAME), static_dir)
+    index.refresh(targets, jobs, mp_context=mp_context)
+    candidates = index.candidates(word, targets)
+    results, failed = redact_files(candidates, Redactor(rules=[], words=[word]), jobs,
+                                   task_function=_redact_in_place_task, progress=progress, mp_context=mp_context)
+    rewritten = sorted(path for path, count in results.items() if count)
+    if rewritten:
+        index.refresh(targets, jobs, mp_context=mp_context)
+    return rewritten, failed
+
+def add_redaction_word(word, script_dir, jobs=None, progress=None, mp_context=None):
+    """Persist `word` in the redaction dictionary and apply it to existing output.
+
+    New recordings pick the word up from the dictionary in the batch stage;
+    existing splits, redacted recordings and transcripts that contain it are
+    rewritten in place.
+    """
+    static_dir = os.path.join(script_dir, "static")
+    words_path = os.path.join(script_dir, WORDS_FILE_NAME)
+    old_words = load_redaction_words(words_path)
+    save_redaction_word(words_path, word)
+    new_words = load_redaction_words(words_path)
+    rewritten, failed = redact_word_everywhere(word, static_dir, jobs, progress, mp_context=mp_context)
+
+    # Every redacted recording now matches what the new dictionary would produce,
+    # so the manifest can move to the new fingerprint without a full re-redaction.
+    # The batch stage may or may not have run with the entropy detector.
+    fingerprints = {}
+    for detectors in ([], [EntropyDetector()]):
+        fingerprints[Redactor(words=old_words, detectors=detectors).fingerprint] = \
+            Redactor(words=new_words, detectors=detectors).fingerprint
+    if not failed and old_words != new_words:
+        manifest_path = os.path.join(static_dir, "redacted_full", MANIFEST_NAME)
+        with manifest_lock(manifest_path):
+            manifest = load_manifest(manifest_path)
+            for entry in manifest.values():
+                entry["rules"] = fingerprints.get(entry.get("rules"), entry.get("rules"))
+            if manifest:
+                save_manifest(manifest_path, manifest)
+    return rewritten, failed
+
+def redact_directory(full_dir, redacted_dir, redactor, jobs=1):
+    manifest_path = os.path.join(redacted_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    known = set(manifest)
+    tasks = collect_tasks(full_dir, redacted_dir, manifest, redactor.fingerprint)
+    results, failed = {}, []
+    if tasks:
+        for _, output_file_path in tasks:
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        results, failed = redact_files(tasks, redactor, jobs)
+    with manifest_lock(manifest_path):
+        # Re-read it: the --follow daemon may have recorded other files meanwhile.
+        current = load_manifest(manifest_path)
+        for relative_path in known - set(manifest):
+            current.pop(relative_path, None)
+        for (input_file_path, _), entry in results.items():
+            current[os.path.relpath(input_file_path, full_dir)] = entry
+        save_manifest(manifest_path, current)
+    return results, failed
+
+class RecordingFollower:
+    """Incrementally redacts one growing recording into its redacted copy.
+
+    `offset` is the input position up to which every event has been written
+    to the output; events still held by the streaming redactor sit past it,
+    so a restart re-reads them instead of losing or duplicating them.
+    """
+
+    def __init__(self, input_path, output_path, redactor, state=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.redactor = redactor
+        state = state or {}
+        self.offset = state.get('offset', 0)
+        self.output_size = state.get('output_size', 0)
+        self.inode = state.get('inode')
+        self.read_offset = self.offset
+        self.size = self.offset
+        self.mtime_ns = None
+        self.streamer = StreamingRedactor(redactor)
+        self.digest = None
+        self._fed = deque()
+        self.last_growth = time.monotonic()
+
+    def state(self):
+        return {'offset': self.offset, 'output_size': self.output_size, 'inode': self.inode}
+
+    def is_complete(self):
+        return self.offset == self.read_offset == self.size and not self._fed
+
+    def manifest_entry(self):
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "sha256": self.digest.hexdigest(),
+                "rules": self.redactor.fingerprint}
+
+    def set_redactor(self, redactor):
+        self.redactor = redactor
+        self.streamer.set_redactor(redactor)
+
+    def _reset(self):
+        self.offset = self.read_offset = self.output_size = 0
+        self.streamer = StreamingRedactor(self.redactor)
+        self.digest = hashlib.sha256()
+        self._fed.clear()
+
+    def _prefix_digest(self):
+        digest = hashlib.sha256()
+        remaining = self.read_offset
+        with open(self.input_path, 'rb') as f:
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest
+
+    def poll(self, idle_flush):
+        stat = os.stat(self.input_path)
+        output_size = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+        # Replaced, truncated, or rewritten underneath us (e.g. by the batch stage): start over.
+        if stat.st_ino != self.inode or stat.st_size < self.read_offset or output_size != self.output_size:
+            self.inode = stat.st_ino
+            self._reset()
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+        written = False
+        now = time.monotonic()
+        if stat.st_size > self.read_offset:
+            if self.digest is None:
+                self.digest = self._prefix_digest()
+            for data in self._read_lines(stat.st_size):
+                self.digest.update(data)
+                written |= self._write(self._feed(data))
+                self.last_growth = now
+        if self._fed and now - self.last_growth >= idle_flush:
+            written |= self._write(self.streamer.flush())
+        return written
+
+    def _read_lines(self, size):
+        """Complete lines between `read_offset` and `size`, at most about
+        FOLLOW_READ_BYTES at a time however far the recording has grown."""
+        with open(self.input_path, 'rb') as f:
+            f.seek(self.read_offset)
+            remaining = size - self.read_offset
+            pending = b''
+            while remaining > 0:
+                chunk = f.read(min(remaining, FOLLOW_READ_BYTES))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = pending + chunk
+                # asciinema may be mid-way through a line; leave the partial line for the next poll.
+                end = data.rfind(b'\n') + 1
+                pending = data[end:]
+                if end:
+                    yield data[:end]
+
+    def _feed(self, data):
+        released = []
+        position = self.read_offset
+        for line in data.splitlines(keepends=True):
+            event = castio.Event(line.rstrip(b'\r\n'), position)
+            position += len(line)
+            try:
+                record = event.record
+            except ValueError:
+                continue
+            text = record[2] if isinstance(record, list) and len(record) > 2 and record[1] == 'o' else None
+            self._fed.append((position, event, text))
+            released.extend(self.streamer.feed(record))
+        self.read_offset = position
+        return released
+
+    def _write(self, released):
+        if not released:
+            return False
+        writer = castio.CastWriter(self.output_path, append=bool(self.output_size))
+        for record in released:
+            self.offset, event, text = self._fed.popleft()
+            writer.write_event(event, None if text is None or record[2] is text else record)
+        self.output_size = writer.tell()
+        writer.close()
+        return True
+
+def follow_directory(full_dir, redacted_dir, redactor, interval=1.0, idle_flush=5.0, words_path=None,
+                     extra_words=()):
+    """Keep redacted_dir current with the recordings growing in full_dir.
+
+    With `words_path`, the dictionary is reloaded whenever it changes (e.g.
+    add_redaction_word from the UI), so new words reach the events still
+    held back and the manifest gets the new rules fingerprint.
+    """
+    state_path = os.path.join(redacted_dir, FOLLOW_STATE_NAME)
+    manifest_path = os.path.join(redacted_dir, MANIFEST_NAME)
+    states = load_manifest(state_path)
+    followers = {}
+    words_mtime = file_mtime_ns(words_path)
+    print(f"Following {full_dir} (Ctrl-C to stop)")
+
+    def reload_words():
+        nonlocal redactor, words_mtime
+        mtime = file_mtime_ns(words_path)
+        if mtime == words_mtime:
+            return
+        words_mtime = mtime
+        reloaded = Redactor(words=load_redaction_words(words_path) + list(extra_words), detectors=redactor.detectors)
+        if reloaded.fingerprint == redactor.fingerprint:
+            return
+        print(f"Reloaded {words_path}")
+        redactor = reloaded
+        for follower in followers.values():
+            follower.set_redactor(redactor)
+
+    def poll_all(flush_after):
+        if words_path:
+            reload_words()
+        manifest = load_manifest(manifest_path)
+        states_changed = False
+        entries = {}
+        for name in sorted(os.listdir(full_dir)):
+            if not name.endswith('.cast'):
+                continue
+            input_path = os.path.join(full_dir, name)
+            output_path = os.path.join(redacted_dir, name)
+            follower = followers.get(name)
+            if follower is None:
+                state = states.get(name)
+                if state is None and is_current(manifest.get(name), input_path, output_path, redactor.fingerprint):
+                    # Already redacted by the batch stage; pick up from where it stopped.
+                    stat = os.stat(input_path)
+                    state = {'offset': stat.st_size, 'output_size': os.path.getsize(output_path),
+                             'inode': stat.st_ino}
+                follower = followers[name] = RecordingFollower(input_path, output_path, redactor, state)
+            try:
+                if follower.poll(flush_after):
+                    states[name] = follower.state()
+                    states_changed = True
+            except OSError as e:
+                print(f"Error following {input_path}: {e}")
+                continue
+            if follower.digest is not None and follower.is_complete():
+                entry = follower.manifest_entry()
+                if manifest.get(name) != entry:
+                    entries[name] = entry
+        if states_changed:
+            save_manifest(state_path, states)
+        if entries:
+            with manifest_lock(manifest_path):
+                manifest = load_manifest(manifest_path)
+                manifest.update(entries)
+                save_manifest(manifest_path, manifest)
+
+    try:
+        while True:
+            poll_all(idle_flush)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        poll_all(0)
 
 def main():
     parser = argparse.ArgumentParser(description="Redacts sensitive information from .cast files.")
     parser.add_argument('-f', '--file', help="Specify the full path to a single file to redact.")
     parser.add_argument('-w', '--word', help="Specify a custom word to redact.")
+    parser.add_argument('-e', '--everywhere', action='store_true',
+                        help="With --word, redact it in place from every split, redacted recording and text file.")
+    parser.add_argument('-a', '--add-word',
+                        help="Add a word to the persistent redaction dictionary and redact it everywhere it appears.")
+    parser.add_argument('--entropy', action='store_true',
+                        help="Also redact high-entropy tokens such as API keys, tickets and base64 blobs.")
+    parser.add_argument('--follow', action='store_true',
+                        help="Run as a daemon that tails recordings in static/full and keeps static/redacted_full current.")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Seconds between polls in --follow mode.")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of worker processes for batch redaction (0 uses every core).")
     args = parser.parse_args()
 
     script_dir = os.path.dirname(os.path.realpath(__file__))
     redacted_dir = os.path.join(script_dir, "static", "redacted_full")
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    words = load_redaction_words(os.path.join(script_dir, WORDS_FILE_NAME))
+    if args.word:
+        words.append(args.word)
+    detectors = [EntropyDetector()] if args.entropy else []
 
-    if args.file:
+    if args.follow:
+        full_dir = os.path.join(script_dir, "static", "full")
+        os.makedirs(redacted_dir, exist_ok=True)
+        follow_directory(full_dir, redacted_dir, Redactor(words=words, detectors=detectors), args.interval,
+                         words_path=os.path.join(script_dir, WORDS_FILE_NAME),
+                         extra_words=[args.word] if args.word else [])
+    elif args.add_word:
+        rewritten, _ = add_redaction_word(args.add_word, script_dir, jobs)
+        print(f"Added '{args.add_word}' to the dictionary and redacted it from {len(rewritten)} files")
+    elif args.file:
         input_file_path = args.file
         output_file_path = input_file_path if args.word else os.path.join(redacted_dir, os.path.basename(input_file_path))
         os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-        process_cast_file(input_file_path, output_file_path, args.word, force=True)
+        process_cast_file(input_file_path, output_file_path, force=True,
+                          redactor=Redactor(words=words, detectors=detectors))
+    elif args.word and args.everywhere:
+        rewritten, _ = redact_word_everywhere(args.word, os.path.join(script_dir, "static"), jobs)
+        print(f"Redacted '{args.word}' from {len(rewritten)} files")
     else:
         full_dir = os.path.join(script_dir, "static", "full")
-        for root, dirs, files in os.walk(full_dir):
-            for file in files:
-                if file.endswith('.cast'):
-                    input_file_path = os.path.join(root, file)
-                    output_file_path = os.path.join(redacted_dir, os.path.relpath(input_file_path, full_dir))
-                    if not os.path.exists(output_file_path):
-                        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-                        process_cast_file(input_file_path, output_file_path, args.word)
+        os.makedirs(redacted_dir, exist_ok=True)
+        redact_directory(full_dir, redacted_dir, Redactor(words=words, detectors=detectors), jobs)
 
 if __name__ == "__main__":
     main()
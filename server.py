@@ -1,13 +1,21 @@
-from flask import Flask, render_template_string, request, jsonify
-import subprocess
+from flask import Flask, render_template_string, request, jsonify, send_from_directory, Response, abort
+import io
+import multiprocessing
 import os
 import shutil
 import psutil
-import json
 import re
 import pyte
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
+import castio
+import catalog
+import edit
+import redact
+
 
 app = Flask(__name__)
 
@@ -26,28 +34,11 @@ def status():
 
 def get_cast_files():
     static_dir = os.path.join(app.root_path, 'static', 'splits')
+    segment_catalog.sync(static_dir)
 
-    # FIX: crashes on fresh install before split.py has run
-    if not os.path.exists(static_dir):
-        return [], {}
-
-    files = [f for f in os.listdir(static_dir) if f.endswith('.cast')]
-
-    mappings_file = os.path.join(static_dir, 'file_timestamp_mapping.json')
-    timestamps = {}
-    # FIX: crashes if mapping file doesn't exist yet
-    if os.path.exists(mappings_file):
-        with open(mappings_file, 'r') as f:
-            mappings = json.load(f)
-            timestamps = {fp: ts for fp, ts in mappings.items() if ts is not None}
-
-    if request.path.startswith('/command/'):
-        sorted_files = sorted(files, key=lambda x: timestamps.get(os.path.join(static_dir, x), ''))
-    else:
-        sorted_files = sorted(files)
-
-    tools = sorted(set(f.split('_')[0] for f in sorted_files))
-    files_dict = {tool: [f for f in sorted_files if f.split('_')[0] == tool] for tool in tools}
+    by_timestamp = request.path.startswith('/command/')
+    tools = segment_catalog.tools()
+    files_dict = {tool: segment_catalog.segments(tool, by_timestamp) for tool in tools}
     return tools, files_dict
 
 
@@ -100,62 +91,60 @@ def get_disk_usage():
     return free_gb, recordings_size
 
 
-def load_favorites():
-    favorites_file = os.path.join(app.root_path, 'favorites.txt')
-    favorites = {}
-    if os.path.exists(favorites_file):
-        with open(favorites_file, 'r') as f:
-            for line in f:
-                filename = line.strip()
-                if filename:
-                    favorites[filename] = True
-    return favorites
+segment_catalog = catalog.open_catalog(os.path.join(app.root_path, 'static', 'splits'),
+                                       os.path.join(app.root_path, 'favorites.txt'))
+recordings_dir = os.path.join(app.root_path, 'static', 'redacted_full')
+# edit.py re-times the physical splits in place; virtual segments get the same
+# chain as they are streamed.
+playback_transformation = edit.parse_transformations(edit.DEFAULT_TRANSFORMS, True)
 
-def save_favorites(favorites):
-    favorites_file = os.path.join(app.root_path, 'favorites.txt')
-    with open(favorites_file, 'w') as f:
-        for filename in favorites:
-            f.write(filename + '\n')
 
-favorites = load_favorites()
+def segment_lines(name):
+    """Lines of segment `name`: its file, or for a virtual segment the
+    header and re-timed span of its recording."""
+    span = segment_catalog.resolve_virtual_segment(name, recordings_dir)
+    if span is not None:
+        return edit.transform_lines(playback_transformation, castio.segment_lines(
+            span['path'], span['start'], span['end'], span['time_offset']))
+    return None
 
 
-def combine_cast_files(input_files, output_file, debug=False):
-    combined_events = []
-    start_time_offset = 0.0
-    header = None
-
-    for file in tqdm(input_files, desc="Combining CAST Files"):
-        file_path = os.path.join(app.root_path, 'static', 'splits', file)
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            if not header:
-                header = json.loads(lines[0].strip())
-                combined_events.append(json.dumps(header))
-            events = [json.loads(line.strip()) for line in lines[1:]]
-
-            if not events:
-                continue
-
-            if len(combined_events) > 1:
-                last_event = json.loads(combined_events[-1])
-                if not isinstance(last_event, list) or len(last_event) < 1:
-                    raise ValueError("Last event is not in the expected format.")
-                last_event_time = float(last_event[0])
-            else:
-                last_event_time = 0.0
+@app.route('/cast/<path:filename>')
+def serve_cast(filename):
+    lines = segment_lines(filename)
+    if lines is None:
+        if segment_catalog.virtual_segment(filename) is not None:
+            abort(404)
+        return send_from_directory(os.path.join(app.root_path, 'static', 'splits'), filename)
+    return Response((line + b'\n' for line in lines), mimetype='application/x-asciicast')
 
-            first_event_time = float(events[0][0])
-            if last_event_time > 0.0:
-                start_time_offset += last_event_time - first_event_time
 
-            for event in events:
-                event_time = float(event[0]) + start_time_offset
-                combined_events.append(json.dumps([event_time, event[1], event[2]]))
+def combine_cast_files(input_files, output_file, debug=False):
+    start_time_offset = 0.0
+    last_event_time = 0.0
+    header_written = False
 
     output_path = os.path.join(app.root_path, 'static', 'splits', output_file)
-    with open(output_path, 'w') as f:
-        f.write('\n'.join(combined_events) + '\n')
+    with castio.CastWriter(output_path, atomic=True) as writer:
+        for file in tqdm(input_files, desc="Combining CAST Files"):
+            lines = segment_lines(file)
+            if lines is not None:
+                source = io.BytesIO(b'\n'.join(lines))
+            else:
+                source = os.path.join(app.root_path, 'static', 'splits', file)
+            with castio.CastReader(source) as reader:
+                if not header_written:
+                    writer.write_header(reader.header)
+                    header_written = True
+
+                first_event = True
+                for event in reader.records():
+                    if first_event:
+                        if last_event_time > 0.0:
+                            start_time_offset += last_event_time - float(event[0])
+                        first_event = False
+                    last_event_time = float(event[0]) + start_time_offset
+                    writer.write([last_event_time, event[1], event[2]])
 
     if debug:
         print(f"Combined {len(input_files)} files into {output_file}")
@@ -169,8 +158,10 @@ def combine_files():
     if not new_file_name.endswith('.cast'):
         new_file_name += '.cast'
     combine_cast_files(files, new_file_name, debug=True)
-    favorites[new_file_name] = True
-    save_favorites(favorites)
+    output_path = os.path.join(app.root_path, 'static', 'splits', new_file_name)
+    segment_catalog.add_segment(new_file_name, timestamp=segment_catalog.timestamp(files[0]) if files else None,
+                                size=os.path.getsize(output_path))
+    segment_catalog.add_favorite(new_file_name)
     return jsonify(success=True)
 
 
@@ -179,7 +170,8 @@ def index():
     tools, files_dict = get_cast_files()
     free_gb, recordings_size = get_disk_usage()
     return render_template_string(HTML_TEMPLATE, tools=tools, files_dict=files_dict,
-                                  free_gb=free_gb, recordings_size=recordings_size, favorites=favorites)
+                                  free_gb=free_gb, recordings_size=recordings_size,
+                                  favorites=segment_catalog.favorites())
 
 @app.route('/command/<command>')
 def command_page(command):
@@ -190,8 +182,7 @@ def command_page(command):
     files_with_dates = []
 
     for file in command_files:
-        file_path = os.path.join(app.root_path, 'static', 'splits', file)
-        timestamp = get_timestamp(file_path)
+        timestamp = segment_catalog.timestamp(file)
         date = timestamp.split()[0] if timestamp else None
 
         if date and date != current_date:
@@ -200,44 +191,91 @@ def command_page(command):
 
         files_with_dates.append(file)
 
-    return render_template_string(COMMAND_TEMPLATE, command=command, command_files=files_with_dates, favorites=favorites)
-
-
-def get_timestamp(file_path):
-    mappings_file = os.path.join(app.root_path, 'static', 'splits', 'file_timestamp_mapping.json')
-    # FIX: crashes with FileNotFoundError if mapping file doesn't exist yet
-    if not os.path.exists(mappings_file):
-        return None
-    with open(mappings_file, 'r') as f:
-        mappings = json.load(f)
-        return mappings.get(file_path)
+    return render_template_string(COMMAND_TEMPLATE, command=command, command_files=files_with_dates,
+                                  favorites=segment_catalog.favorites())
 
 
 @app.route('/favorites')
 def favorites_page():
-    _, files_dict = get_cast_files()
-    favorites_files = [f for f in favorites if f in sum(files_dict.values(), [])]
+    segment_catalog.sync(os.path.join(app.root_path, 'static', 'splits'))
+    existing = set(segment_catalog.segments())
+    favorites_files = [f for f in segment_catalog.favorites() if f in existing]
     return render_template_string(COMMAND_TEMPLATE, command="Favorites", command_files=favorites_files, favorites=favorites_files)
 
 
+# Words redacted "everywhere" are added to the persistent dictionary. The
+# rewrite runs one job at a time off the request thread, fans out over
+# redact's process pool and reports progress into redaction_jobs. The pool
+# is started from that thread, so its workers come from a forkserver rather
+# than a fork of the threaded server.
+redaction_executor = ThreadPoolExecutor(max_workers=1)
+redaction_jobs = {}
+redaction_jobs_lock = threading.Lock()
+
+
+def update_redaction_job(job_id, **fields):
+    with redaction_jobs_lock:
+        redaction_jobs[job_id].update(fields)
+
+
+def run_redaction_job(job_id, word):
+    update_redaction_job(job_id, state="running")
+    try:
+        rewritten, failed = redact.add_redaction_word(
+            word, app.root_path,
+            progress=lambda done, total: update_redaction_job(job_id, done=done, total=total),
+            mp_context=multiprocessing.get_context("forkserver"))
+        update_redaction_job(job_id, state="complete", rewritten=len(rewritten), failed=len(failed))
+    except Exception as e:
+        update_redaction_job(job_id, state="failed", error=str(e))
+
+
 @app.route('/redact', methods=['POST'])
 def redact_text():
     data = request.json
     word = data['word']
+    if data.get('scope') == 'all':
+        job_id = uuid.uuid4().hex
+        with redaction_jobs_lock:
+            redaction_jobs[job_id] = {"state": "queued", "done": 0, "total": 0}
+        redaction_executor.submit(run_redaction_job, job_id, word)
+        return jsonify(success=True, job=job_id)
+
     file_to_redact = os.path.join(app.root_path, 'static', 'splits', data['file'])
-    # FIX: original called `python3 redact.py` as a bare name — only works if
-    # CWD happens to be the project directory. Use absolute path instead.
-    redact_script = os.path.join(app.root_path, 'redact.py')
-    subprocess.run(['python3', redact_script, '-w', word, '-f', file_to_redact], check=True)
+    span = segment_catalog.virtual_segment(data['file'])
+    if span is not None:
+        # A virtual segment is redacted in its recording; its span is found
+        # again from the event ordinals on the next request. The recording is
+        # regenerated from static/full after any rule change, so the word is
+        # also kept in the dictionary the batch and --follow stages apply.
+        file_to_redact = os.path.join(recordings_dir, span['recording'])
+    try:
+        if span is not None:
+            redact.save_redaction_word(os.path.join(app.root_path, redact.WORDS_FILE_NAME), word)
+        redact.redact_file(file_to_redact, word)
+    except Exception as e:
+        return jsonify(success=False, error=str(e)), 500
     return jsonify(success=True)
 
 
+@app.route('/redact_status/<job_id>')
+def redact_status(job_id):
+    with redaction_jobs_lock:
+        job = redaction_jobs.get(job_id)
+        job = dict(job) if job else None
+    if job is None:
+        return jsonify(success=False, error="unknown job"), 404
+    return jsonify(success=True, **job)
+
+
 @app.route('/delete', methods=['POST'])
 def delete_file():
     data = request.json
     file_path = os.path.join(app.root_path, 'static', 'splits', data['file'])
     try:
-        os.remove(file_path)
+        if segment_catalog.virtual_segment(data['file']) is None:
+            os.remove(file_path)
+        segment_catalog.delete_segment(data['file'])
         return jsonify(success=True)
     except Exception as e:
         return jsonify(success=False, error=str(e)), 500
@@ -250,21 +288,45 @@ def edit_file_name():
     old_path = os.path.join(splits, data['old_file'])
     new_path = os.path.join(splits, data['new_file'])
     try:
-        os.rename(old_path, new_path)
+        if segment_catalog.virtual_segment(data['old_file']) is None:
+            os.rename(old_path, new_path)
+        segment_catalog.rename_segment(data['old_file'], data['new_file'])
         return jsonify(success=True)
     except Exception as e:
         return jsonify(success=False, error=str(e)), 500
 
 
+@app.route('/transform', methods=['POST'])
+def transform_file():
+    """Run a chain of edit.py transformations, e.g. ["idle:2", "speed:1.5"],
+    over one split in place, in a single pass."""
+    data = request.get_json()
+    if segment_catalog.virtual_segment(data['file']) is not None:
+        return jsonify(success=False, error="a virtual segment is replayed from its recording and "
+                                            "cannot be transformed"), 400
+    if not data.get('transforms'):
+        return jsonify(success=False, error="no transformations given"), 400
+    try:
+        transformation = edit.parse_transformations(data['transforms'], True)
+    except edit.ValidationError as e:
+        return jsonify(success=False, error=str(e)), 400
+    file_path = os.path.join(app.root_path, 'static', 'splits', data['file'])
+    try:
+        # Recorded like edit.py's own runs, so it does not apply these steps again.
+        applied = edit.applied_steps(segment_catalog.quantized().get(data['file']), os.stat(file_path))
+        edit.StreamingTransformer(transformation, file_path, file_path, True).transform()
+        stat = os.stat(file_path)
+        steps = [step.fingerprint() for step in edit.transformation_steps(transformation)]
+        segment_catalog.record_quantized([(data['file'], stat.st_size, stat.st_mtime_ns, ' | '.join(applied + steps))])
+    except (edit.ValidationError, OSError) as e:
+        return jsonify(success=False, error=str(e)), 500
+    return jsonify(success=True)
+
+
 @app.route('/toggle_favorite', methods=['POST'])
 def toggle_favorite():
     data = request.json
-    file = data['file']
-    if file in favorites:
-        favorites.pop(file)
-    else:
-        favorites[file] = True
-    save_favorites(favorites)
+    segment_catalog.toggle_favorite(data['file'])
     return jsonify(success=True)
 
 
@@ -805,6 +867,7 @@ COMMAND_TEMPLATE = '''
                     <div class="redact-controls">
                         <input type="text" id="redact-word-{{ item }}" placeholder="Word to redact…">
                         <button onclick="redactAndReload('{{ item }}')">Redact &amp; Reload</button>
+                        <button onclick="redactEverywhere('{{ item }}')">Redact Everywhere</button>
                     </div>
                     <div class="delete-controls">
                         <button class="delete-button" onclick="deleteFile('{{ item }}')">🗑 Delete</button>
@@ -846,7 +909,7 @@ COMMAND_TEMPLATE = '''
             } else {
                 document.querySelectorAll('.dropdown-content').forEach(p => p.style.display = 'none');
                 player.style.display = 'block';
-                AsciinemaPlayer.create('/static/splits/' + filename + '?_=' + new Date().getTime(), player);
+                AsciinemaPlayer.create('/cast/' + filename + '?_=' + new Date().getTime(), player);
             }
         }
 
@@ -857,7 +920,7 @@ COMMAND_TEMPLATE = '''
                 const player = document.getElementById('demo-' + openFile);
                 if (player) {
                     player.style.display = 'block';
-                    AsciinemaPlayer.create('/static/splits/' + openFile + '?_=' + new Date().getTime(), player);
+                    AsciinemaPlayer.create('/cast/' + openFile + '?_=' + new Date().getTime(), player);
                 }
             }
         };
@@ -990,12 +1053,41 @@ COMMAND_TEMPLATE = '''
                     document.getElementById('redact-word-' + filename).value = '';
                     setTimeout(() => {
                         playerContainer.style.display = 'block';
-                        AsciinemaPlayer.create('/static/splits/' + filename + '?_=' + ts, playerContainer);
+                        AsciinemaPlayer.create('/cast/' + filename + '?_=' + ts, playerContainer);
                     }, 1000);
                 }
             }).catch(err => console.error(err));
         }
 
+        function redactEverywhere(filename) {
+            var input = document.getElementById('redact-word-' + filename);
+            var word = input.value;
+            if (!word) { alert('Enter a word to redact first.'); return; }
+            fetch('/redact', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ word, file: filename, scope: 'all' })
+            }).then(r => r.json()).then(data => {
+                if (!data.success) { alert('Failed to start redaction.'); return; }
+                input.value = '';
+                var poll = setInterval(() => {
+                    fetch('/redact_status/' + data.job).then(r => r.json()).then(job => {
+                        input.placeholder = 'Redacting… ' + job.done + '/' + job.total;
+                        if (job.state === 'complete' || job.state === 'failed') {
+                            clearInterval(poll);
+                            input.placeholder = 'Word to redact…';
+                            if (job.state === 'failed') { alert('Redaction failed: ' + job.error); return; }
+                            var playerContainer = document.getElementById('demo-' + filename);
+                            var controls = playerContainer.querySelectorAll('.redact-controls, .delete-controls');
+                            playerContainer.innerHTML = '';
+                            controls.forEach(c => playerContainer.appendChild(c));
+                            AsciinemaPlayer.create('/cast/' + filename + '?_=' + new Date().getTime(), playerContainer);
+                        }
+                    }).catch(err => { clearInterval(poll); console.error(err); });
+                }, 1000);
+            }).catch(err => console.error(err));
+        }
+
         function deleteFile(filename) {
             if (confirm('Delete ' + filename.split('.cast')[0] + '? This cannot be undone.')) {
                 fetch('/delete', {
@@ -13,13 +13,16 @@ def gather_static_files():
 setup(
     name='patronus',
     version='0.1.0',
-    py_modules=['patronus', 'edit', 'split', 'redact', 'server'],
+    py_modules=['patronus', 'castio', 'catalog', 'edit', 'prompts', 'split', 'redact', 'server', 'vt'],
     install_requires=[
         'Flask',
         'pyte',
         'tqdm',
         'asciinema',
     ],
+    extras_require={
+        'fast': ['orjson', 'numpy'],
+    },
     include_package_data=True,  # Uses MANIFEST.in to include data files
     entry_points={
         'console_scripts': [
@@ -1,21 +1,185 @@
 import re
 import sys
-import json
 import pyte
+from pyte import modes as mo
 import os
 import argparse
+import base64
+import binascii
+import hashlib
+import shutil
+import time
+from collections import deque
+import castio
+import catalog
+import prompts
+import vt
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from wcwidth import wcwidth
 
-parser = argparse.ArgumentParser(description='Split CAST files')
-parser.add_argument('--debug', action='store_true', help='Enable debug mode')
-
-args = parser.parse_args()
+args = argparse.Namespace(debug=False)
+
+STAGING_DIR = '.staging'
+FINGERPRINT_CHUNK = 1 << 20
+
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [A-Z]{3}')
+# OSC 133 markers from configure.sh, as JSON-escaped in an event.
+MARKER_PREFIX = re.compile(rb'\\u001[bB]\]133;')
+MARKER = re.compile(rb'\\u001[bB]\]133;([A-D])((?:;[^;\\]*)*)(?:\\u0007|\\u001[bB]\\\\)')
+MARKER_PEEK_BYTES = 1 << 20
+TRIVIAL_COMMANDS = {'cd', 'ls', 'ls -la', 'nano', 'vi', }
+PROMPTS_FILE_NAME = 'prompt_patterns.txt'
+DEFAULT_COLUMNS = 236
+DEFAULT_LINES = 49
+# Prompts are found on a screen of this fixed size whatever the recording's;
+# only transcripts are rendered at the size in the header.
+SPLIT_SCREEN = (236, 49)
+SCROLLBACK_LINES = 10000
+# Bumped whenever transcripts are rendered differently, so old ones are rebuilt.
+TRANSCRIPT_VERSION = '2'
+FEED_BATCH = 64
+DEFAULT_SCANNER = prompts.PromptScanner()
+ENGINES = ('pyte', 'vt')
 
 class PatchedScreen(pyte.Screen):
+    """pyte screen that counts scrolled-off lines and keeps `history` of them as (serial, text)."""
+
+    scrolled = 0
+
+    def __init__(self, columns, lines, history=0):
+        self.history = deque(maxlen=history) if history else None
+        self._cells = {}
+        self._cells_attrs = None
+        super().__init__(columns, lines)
+
     def select_graphic_rendition(self, *attrs, private=False):
         super().select_graphic_rendition(*attrs)
 
+    def render_line(self, y):
+        return render_line(self, y)
+
+    def draw(self, data):
+        """pyte's draw with a fast path for printable ASCII outside insert mode."""
+        text = data.translate(self.g1_charset if self.charset else self.g0_charset)
+        if mo.IRM in self.mode or not (text.isascii() and text.isprintable()):
+            return super().draw(data)
+
+        cursor = self.cursor
+        attrs = cursor.attrs
+        if attrs is not self._cells_attrs:
+            self._cells = {}
+            self._cells_attrs = attrs
+        cells = self._cells
+        columns = self.columns
+        autowrap = mo.DECAWM in self.mode
+        buffer = self.buffer
+        for char in text:
+            if cursor.x == columns:
+                if autowrap:
+                    self.dirty.add(cursor.y)
+                    self.carriage_return()
+                    self.linefeed()
+                else:
+                    cursor.x -= 1
+            cell = cells.get(char)
+            if cell is None:
+                cell = cells[char] = attrs._replace(data=char)
+            buffer[cursor.y][cursor.x] = cell
+            cursor.x += 1
+        self.dirty.add(cursor.y)
+
+    def index(self):
+        top, bottom = self.margins or pyte.screens.Margins(0, self.lines - 1)
+        if self.cursor.y == bottom:
+            self.scrolled += 1
+            # Lines leaving a scroll region below the top row stay on screen.
+            if self.history is not None and top == 0:
+                self.history.append((self.scrolled, render_line(self, 0).rstrip()))
+        super().index()
+
+    def erase_in_display(self, how=0, *args, **kwargs):
+        if how == 2 or how == 3:
+            if self.history is not None:
+                self.push_screen()
+            self.scrolled += self.lines
+        super().erase_in_display(how, *args, **kwargs)
+
+    def push_screen(self):
+        """Move the screen's text, up to its last non-blank row, to history."""
+        rows = [render_line(self, y).rstrip() for y in range(self.lines)]
+        while rows and not rows[-1]:
+            rows.pop()
+        self.history.extend((self.scrolled + y + 1, text) for y, text in enumerate(rows))
+
+
+def render_line(screen, y):
+    """Render one buffer row the way `screen.display` does."""
+    line = screen.buffer[y]
+    columns = screen.columns
+    if not line:
+        return ' ' * columns
+    chars = [' '] * columns
+    for x, char in line.items():
+        if x < columns:
+            chars[x] = char.data
+    text = ''.join(chars)
+    if text.isascii():
+        return text
+
+    # Wide characters take two cells; display() skips the cell after them.
+    chars = []
+    is_wide_char = False
+    for x in range(columns):
+        if is_wide_char:
+            is_wide_char = False
+            continue
+        char = line[x].data
+        # A stub left by an overwritten wide character is empty.
+        is_wide_char = bool(char) and wcwidth(char[0]) == 2
+        chars.append(char)
+    return ''.join(chars)
+
+
+class DisplayTracker:
+    """Rendered copy of a pyte screen, re-rendering only `screen.dirty` rows."""
+
+    def __init__(self, screen, scanner=None):
+        self.screen = screen
+        self.scanner = scanner or DEFAULT_SCANNER
+        self.lines = [''] * screen.lines
+        self.prompt_rows = set()
+        self.command = None
+        screen.dirty.update(range(screen.lines))
+
+    def prompt_at_cursor(self):
+        """True if the cursor row ends in a prompt with nothing typed yet."""
+        self.update()
+        line = self.lines[self.screen.cursor.y]
+        end = self.scanner.prompt_end(line)
+        return end is not None and not line[end:].strip()
+
+    def update(self):
+        dirty = self.screen.dirty
+        if not dirty:
+            return
+        lines = self.lines
+        prompt_rows = self.prompt_rows
+        for y in dirty:
+            if y >= len(lines):
+                continue
+            text = self.screen.render_line(y)
+            lines[y] = text
+            if self.scanner.has_prompt(text):
+                prompt_rows.add(y)
+            else:
+                prompt_rows.discard(y)
+        dirty.clear()
+        if prompt_rows:
+            self.command = self.scanner.command(lines[max(prompt_rows)])
+        else:
+            self.command = None
+
 def generate_filename(command, part_index, timestamp=None):
     cleaned_command_name = clean_filename(command)
     timestamp_part = timestamp.replace(' ', '_') if timestamp else ""
@@ -24,29 +188,40 @@ def generate_filename(command, part_index, timestamp=None):
         base_name = base_name[:250] + ".cast"
     return f"{base_name}_{part_index}.cast"
 
-def process_with_terminal_emulator(input_file, output_file):
-    screen = PatchedScreen(236, 49)
-    stream = pyte.Stream(screen)
-    screen.reset()
-
-    with open(input_file, 'r') as file:
-        lines = file.readlines()
-    
-    lines = lines[1:]
-
-    for line in lines:
-        try:
-            data = json.loads(line.strip())
-            if isinstance(data, list) and len(data) == 3 and isinstance(data[2], str):
-                text_with_escapes = data[2]
-            else:
-                text_with_escapes = line.strip()
-        except json.JSONDecodeError as e:
-            text_with_escapes = line.strip()
-        
-        stream.feed(text_with_escapes)
-    
-    output_lines = "\n".join(screen.display)
+def new_emulator(engine, columns, lines, history=0):
+    """(screen, stream) for `engine`; a vt.Screen parses its own input."""
+    if engine == 'vt':
+        screen = vt.Screen(columns, lines)
+        return screen, screen
+    screen = PatchedScreen(columns, lines, history=history)
+    return screen, pyte.Stream(screen)
+
+def screen_size(header):
+    """(columns, lines) of the terminal a cast header describes."""
+    if not isinstance(header, dict):
+        return DEFAULT_COLUMNS, DEFAULT_LINES
+    try:
+        return int(header.get('width') or DEFAULT_COLUMNS), int(header.get('height') or DEFAULT_LINES)
+    except (TypeError, ValueError):
+        return DEFAULT_COLUMNS, DEFAULT_LINES
+
+def process_with_terminal_emulator(input_file, output_file, span=None):
+    """Write the scrollback and final screen of `input_file` (or its `span`) to `output_file`."""
+    with castio.CastReader(input_file, offset=span['start'] if span else 0) as reader:
+        header = castio.read_header(input_file) if span else reader.header
+        screen = PatchedScreen(*screen_size(header), history=SCROLLBACK_LINES)
+        stream = pyte.Stream(screen)
+        screen.reset()
+
+        pending = []
+        for text_with_escapes in event_texts(reader, span):
+            pending.append(text_with_escapes)
+            if len(pending) >= FEED_BATCH:
+                stream.feed(''.join(pending))
+                pending = []
+        stream.feed(''.join(pending))
+
+    output_lines = "\n".join([text for _, text in screen.history] + screen.display)
 
     try:
         with open(output_file, 'w') as file:
@@ -57,7 +232,57 @@ def process_with_terminal_emulator(input_file, output_file):
     return output_lines
 
 
+def event_texts(reader, span=None):
+    """What each event of `reader` feeds the emulator, up to the end of `span`."""
+    for event in reader:
+        if span and event.offset >= span['end']:
+            break
+        try:
+            data = event.record
+            if isinstance(data, list) and len(data) == 3 and isinstance(data[2], str):
+                yield data[2]
+                continue
+        except ValueError:
+            pass
+        yield event.raw.decode('utf-8', 'replace').strip()
+
+
+def transcript_fingerprint(input_file, span=None):
+    """Hash of the screen size and text a replay of `input_file` feeds the emulator."""
+    digest = hashlib.blake2b(digest_size=16)
+    with castio.CastReader(input_file, offset=span['start'] if span else 0) as reader:
+        header = castio.read_header(input_file) if span else reader.header
+        digest.update(repr(screen_size(header)).encode())
+        for text in event_texts(reader, span):
+            digest.update(text.encode('utf-8', 'surrogatepass'))
+    return f'{TRANSCRIPT_VERSION}:{digest.hexdigest()}'
+
+
+def is_up_to_date(output_file, input_file):
+    try:
+        return os.stat(output_file).st_mtime_ns >= os.stat(input_file).st_mtime_ns
+    except OSError:
+        return False
+
+
+def refresh_transcript(name, input_file, output_file, fingerprints, span=None):
+    """Re-render `output_file` unless the catalog has it rendered from the same text
+    by this TRANSCRIPT_VERSION; returns (name, fingerprint) or None."""
+    known = fingerprints.get(name)
+    current = known is not None and known.startswith(f'{TRANSCRIPT_VERSION}:') and os.path.exists(output_file)
+    if current and is_up_to_date(output_file, input_file):
+        return None
+    fingerprint = transcript_fingerprint(input_file, span)
+    if current and known == fingerprint:
+        os.utime(output_file)
+    else:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        process_with_terminal_emulator(input_file, output_file, span)
+    return name, fingerprint
+
+
 def create_text_versions():
+    """Render any split whose .txt is missing or was rendered from other text."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     static_dir = os.path.join(script_dir, 'static')
     text_dir = os.path.join(static_dir, 'text')
@@ -65,62 +290,86 @@ def create_text_versions():
     os.makedirs(text_dir, exist_ok=True)
 
     splits_dir = os.path.join(static_dir, 'splits')
-    for root, _, files in os.walk(splits_dir):
-        for file in files:
-            if file.endswith('.cast'):
-                input_file = os.path.join(root, file)
-                relative_path = os.path.relpath(input_file, splits_dir)
-                output_file = os.path.join(text_dir, os.path.splitext(relative_path)[0] + '.txt')
-
-                os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-                process_with_terminal_emulator(input_file, output_file)
-
-
+    segment_catalog = catalog.open_catalog(splits_dir)
+    try:
+        fingerprints = segment_catalog.transcripts()
+        refreshed = []
+        for root, _, files in os.walk(splits_dir):
+            for file in files:
+                if file.endswith('.cast'):
+                    input_file = os.path.join(root, file)
+                    relative_path = os.path.relpath(input_file, splits_dir)
+                    output_file = os.path.join(text_dir, os.path.splitext(relative_path)[0] + '.txt')
+                    refreshed.append(refresh_transcript(relative_path, input_file, output_file, fingerprints))
+
+        recordings_dir = os.path.join(static_dir, 'redacted_full')
+        for name in sorted(segment_catalog.virtual_segments()):
+            span = segment_catalog.resolve_virtual_segment(name, recordings_dir)
+            if span is None:
+                continue
+            output_file = os.path.join(text_dir, os.path.splitext(name)[0] + '.txt')
+            refreshed.append(refresh_transcript(name, span['path'], output_file, fingerprints, span))
+        segment_catalog.record_transcripts([entry for entry in refreshed if entry])
+    finally:
+        segment_catalog.close()
 
 
 def write_status(status):
     with open('status_file.txt', 'w') as file:
         file.write(status)
 
-def split_file(input_dir, output_dir, debug=False):
-    mapping_file = os.path.join(output_dir, 'file_timestamp_mapping.json')
-
-    if os.path.exists(mapping_file):
-        with open(mapping_file, 'r') as f:
-            mapping = json.load(f)
-    else:
-        mapping = {}
-
-    processed_files = set()
-    files_to_process = [file for file in os.listdir(input_dir) if file.endswith('.cast')]
+def split_file(input_dir, output_dir, debug=False, text_dir=None, jobs=1, scanner=None, virtual=False,
+               engine='pyte'):
+    segment_catalog = catalog.open_catalog(output_dir)
+
+    files_to_process = []
+    checkpoints = {}
+    for file in sorted(os.listdir(input_dir)):
+        if not file.endswith('.cast'):
+            continue
+        if os.path.getmtime(os.path.join(input_dir, file)) == segment_catalog.recording_mtime(file):
+            if debug:
+                print(f"Skipping file {file} as it hasn't changed since the last run.")
+            continue
+        files_to_process.append(file)
+        checkpoints[file] = segment_catalog.checkpoint(file)
     total_files = len(files_to_process)
-    
+
     write_status("Processing")
 
     try:
-        for file in tqdm(files_to_process, desc="Splitting Redacted Files"):
+        for done, (file, result) in enumerate(split_recordings(files_to_process, input_dir, output_dir,
+                                                               text_dir, jobs, checkpoints, scanner,
+                                                               virtual, engine), 1):
             input_file_path = os.path.join(input_dir, file)
-            output_file_path = generate_output_filename(file, output_dir)
-
-            if file in mapping and os.path.getmtime(input_file_path) == mapping[file]:
-                if debug:
-                    print(f"Skipping file {file} as it hasn't changed since the last run.")
-                continue
-
-            if file not in processed_files:
-                try:
-                    process_cast_file(input_file_path, output_dir, mapping_file)
-                    mapping[file] = os.path.getmtime(input_file_path)
-                    with open(mapping_file, 'w') as f:
-                        json.dump(mapping, f, indent=4)
-                except Exception as e:
-                    print(f"Error processing section of {input_file_path}: {e}")
-                processed_files.add(file)
+            if isinstance(result, Exception):
+                print(f"Error processing section of {input_file_path}: {result}")
+            else:
+                mtime, segments, checkpoint, stale = result
+                if stale:
+                    remove_segment(stale, output_dir, text_dir)
+                    segment_catalog.delete_segment(stale)
+                spans = {name: span for name, _, span in segments if span is not None}
+                for name in spans:
+                    # A physical copy left by an earlier split would shadow the span.
+                    remove_segment(name, output_dir)
+                segment_catalog.record_recording(file, mtime, [
+                    (name, timestamp, span['end'] - span['start'] if span
+                     else os.path.getsize(os.path.join(output_dir, name)))
+                    for name, timestamp, span in segments], checkpoint, spans)
+                if text_dir and engine == 'pyte' and not has_markers(input_file_path):
+                    # process_cast_file wrote each segment's transcript as it cut it.
+                    segment_catalog.record_transcripts([
+                        (name, transcript_fingerprint(input_file_path, span) if span
+                         else transcript_fingerprint(os.path.join(output_dir, name)))
+                        for name, _, span in segments])
                 if debug:
-                    print(f"Processed file: {file}")
+                    if checkpoint and checkpoint['resumed_from'] is not None:
+                        print(f"Processed file: {file} (resumed at byte {checkpoint['resumed_from']})")
+                    else:
+                        print(f"Processed file: {file}")
 
-            current_progress = round((len(processed_files) / total_files) * 100)
+            current_progress = round((done / total_files) * 100)
             write_status(f"Processing {current_progress}% complete")
 
         write_status("Complete")
@@ -129,128 +378,413 @@ def split_file(input_dir, output_dir, debug=False):
         write_status("Failed")
         print(f"An error occurred during file splitting: {e}")
 
-def process_cast_file(input_file_path, output_dir, mapping_file):
-    trivial_commands = {'cd', 'ls', 'ls -la', 'nano', 'vi', }
-    try:
-        with open(input_file_path, 'r') as file:
-            lines = file.readlines()
-    except IOError as e:
-        print(f"Error: Could not read file '{input_file_path}'. {e}")
-        return
+    finally:
+        segment_catalog.close()
 
-    screen = PatchedScreen(236, 49)
-    stream = pyte.Stream(screen)
-    json_line = lines[0].strip()
-    try:
-        json_data = json.loads(json_line)
-    except json.JSONDecodeError:
-        print(f"Error: The first line is not valid JSON in file '{input_file_path}'")
+def split_recordings(files, input_dir, output_dir, text_dir=None, jobs=1, checkpoints=None, scanner=None,
+                     virtual=False, engine='pyte'):
+    """Split each recording, yielding (file, _split_task result or exception) in order."""
+    checkpoints = checkpoints or {}
+    if jobs <= 1 or len(files) <= 1:
+        for file in tqdm(files, desc="Splitting Redacted Files"):
+            try:
+                yield file, _split_task(os.path.join(input_dir, file), output_dir, text_dir,
+                                        checkpoints.get(file), scanner, virtual, engine)
+            except Exception as e:
+                yield file, e
         return
 
-    part_index = 0
-    current_file_content = []
-    start_time = None
-    command_name = None
-    timestamp = None
-
-    if check_file_modification(input_file_path, mapping_file):
-        for line in lines[1:]:
+    staging_root = os.path.join(output_dir, STAGING_DIR)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        for file in files:
+            staging_dir = os.path.join(staging_root, file)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            futures.append(executor.submit(_split_task, os.path.join(input_dir, file),
+                                           os.path.join(staging_dir, 'splits'),
+                                           text_dir and os.path.join(staging_dir, 'text'),
+                                           checkpoints.get(file), scanner, virtual, engine))
+        for file, future in tqdm(zip(files, futures), total=len(files),
+                                 desc=f"Splitting Redacted Files ({jobs} jobs)"):
+            staging_dir = os.path.join(staging_root, file)
             try:
-                data = json.loads(line.strip())
-                try:
-                    stream.feed(data[2])
-                except Exception as e:
-                    print(f"Error processing stream data in file '{input_file_path}'")
-                    continue
-
-                current_display = "\n".join(screen.display)
-                plain_text_content = extract_plain_text(screen.display)
-
-                if re.search(r';[\w,\d,-,_,\.]+@[\w,-.\d]+:', line):
-                    if current_file_content and command_name:
-                        if not is_trivial_command(command_name, trivial_commands):
-                            filename = os.path.join(output_dir, generate_filename(clean_filename(command_name), part_index))
-                            write_segment(filename, [json_line] + current_file_content, timestamp)
-                            part_index += 1
-                        current_file_content = []
-                        command_name = None
-                        timestamp = None
-                    start_time = None
-                
-                adjusted_line = adjust_time(line, start_time)
-                if adjusted_line:
-                    if start_time is None:
-                        start_time = adjusted_line[0]
-                    current_file_content.append(json.dumps([adjusted_line[0] - start_time, data[1], data[2]]))
-                    if timestamp is None and re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [A-Z]{3}', data[2]):
-                        timestamp_match = re.search(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [A-Z]{3}', data[2])
-                        timestamp = timestamp_match.group()
-                
-                if re.search(r'└─\$|➜', current_display):
-                    command_name = extract_command(current_display)
+                result = future.result()
+                for name, _, span in result[1]:
+                    if span is None:
+                        os.replace(os.path.join(staging_dir, 'splits', name), os.path.join(output_dir, name))
+                    text_name = os.path.splitext(name)[0] + '.txt'
+                    staged_text = os.path.join(staging_dir, 'text', text_name)
+                    if text_dir and os.path.exists(staged_text):
+                        os.makedirs(text_dir, exist_ok=True)
+                        os.replace(staged_text, os.path.join(text_dir, text_name))
+                yield file, result
             except Exception as e:
-                print(f"Error processing section of '{input_file_path}'")
-                continue
-
-        if current_file_content and command_name and not is_trivial_command(command_name, trivial_commands):
-            filename = os.path.join(output_dir, generate_filename(clean_filename(command_name), part_index))
-            write_segment(filename, [json_line] + current_file_content, timestamp)
-            update_mapping_file(input_file_path, mapping_file)
+                yield file, e
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+    shutil.rmtree(staging_root, ignore_errors=True)
+
+def _split_task(input_file_path, output_dir, text_dir, checkpoint=None, scanner=None, virtual=False,
+                engine='pyte'):
+    """(mtime, segments, checkpoint, stale segment) for one recording."""
+    os.makedirs(output_dir, exist_ok=True)
+    mtime = os.path.getmtime(input_file_path)
+    if not can_resume(input_file_path, checkpoint):
+        checkpoint = None
+    segments, new_checkpoint = process_cast_file(input_file_path, output_dir, text_dir, checkpoint, scanner,
+                                                 virtual, engine)
+    stale = None
+    if checkpoint and checkpoint['open_segment'] and checkpoint['open_segment'] not in {s[0] for s in segments}:
+        stale = checkpoint['open_segment']
+    return mtime, segments, new_checkpoint, stale
+
+def file_fingerprint(path, size):
+    """Hash the first `size` bytes of `path`."""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        while size > 0:
+            chunk = f.read(min(size, FINGERPRINT_CHUNK))
+            if not chunk:
+                break
+            digest.update(chunk)
+            size -= len(chunk)
+    return digest.hexdigest()
+
+def can_resume(input_file_path, checkpoint):
+    """True if the recording only grew since `checkpoint` was taken."""
+    if checkpoint is None:
+        return False
+    try:
+        if os.path.getsize(input_file_path) < checkpoint['size']:
+            return False
+        return file_fingerprint(input_file_path, checkpoint['size']) == checkpoint['fingerprint']
+    except OSError:
+        return False
 
-def check_file_modification(file_path, mapping_file):
+def remove_segment(name, output_dir, text_dir=None):
+    paths = [os.path.join(output_dir, name)]
+    if text_dir:
+        paths.append(os.path.join(text_dir, os.path.splitext(name)[0] + '.txt'))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def process_cast_file(input_file_path, output_dir, text_dir=None, checkpoint=None, scanner=None, virtual=False,
+                      engine='pyte'):
+    """([(filename, timestamp, span)], checkpoint) for one recording's segments."""
+    if has_markers(input_file_path):
+        return process_marked_cast_file(input_file_path, output_dir, checkpoint, virtual)
+
+    trivial_commands = TRIVIAL_COMMANDS
+    segments = []
     try:
-        with open(mapping_file, 'r') as f:
-            mapping = json.load(f)
-    except FileNotFoundError:
-        mapping = {}
+        json_line, segment_offset, reader = open_recording(input_file_path, checkpoint)
+    except IOError as e:
+        print(f"Error: Could not read file '{input_file_path}'. {e}")
+        return segments, None
 
-    current_timestamp = os.path.getmtime(file_path)
+    with reader:
+        try:
+            header = castio.loads(json_line)
+        except ValueError:
+            print(f"Error: The first line is not valid JSON in file '{input_file_path}'")
+            return segments, None
+        if engine == 'vt':
+            text_dir = None
+        screen, stream = new_emulator(engine, *SPLIT_SCREEN)
+        scanner = scanner or DEFAULT_SCANNER
+        tracker = DisplayTracker(screen, scanner)
+        transcript = SegmentTranscript(*screen_size(header)) if text_dir else None
+
+        part_index = checkpoint['part_index'] if checkpoint else 0
+        open_segment = None
+        segment = new_segment_writer(input_file_path, output_dir, json_line, reader, checkpoint, virtual)
+        start_time = None
+        command_name = None
+        timestamp = None
 
-    stored_timestamp = mapping.get(file_path)
+        try:
+            for event in reader:
+                try:
+                    data = event.record
+                    raw = event.raw
+
+                    is_title = scanner.is_title(raw)
+                    is_hint = not is_title and scanner.is_hint(raw)
+
+                    try:
+                        stream.feed(data[2])
+                        fed = True
+                    except Exception as e:
+                        print(f"Error processing stream data in file '{input_file_path}'")
+                        fed = False
+
+                    if is_title or (is_hint and fed and tracker.prompt_at_cursor()):
+                        if segment.events and command_name:
+                            if not is_trivial_command(command_name, trivial_commands):
+                                name = generate_filename(clean_filename(command_name), part_index)
+                                span = segment.commit(name)
+                                if transcript:
+                                    write_transcript(text_dir, name, transcript.lines())
+                                segments.append((name, timestamp, span))
+                                part_index += 1
+                            else:
+                                segment.discard()
+                            if transcript:
+                                transcript.reset()
+                            command_name = None
+                            timestamp = None
+                            segment_offset = event.offset
+                        start_time = None
+
+                    if not fed:
+                        continue
+
+                    # Like the full-screen scan this replaced, the bottom-most prompt
+                    # names the command after every event, not just at line feeds.
+                    tracker.update()
+                    if tracker.command is not None:
+                        command_name = tracker.command
+
+                    event_time = float(data[0])
+                    if start_time is None:
+                        start_time = event_time
+                    segment.write(event, [event_time - start_time, data[1], data[2]])
+                    if transcript:
+                        transcript.feed(data[2])
+                    if timestamp is None:
+                        timestamp_match = TIMESTAMP_PATTERN.search(data[2])
+                        if timestamp_match:
+                            timestamp = timestamp_match.group()
+                except Exception as e:
+                    print(f"Error processing section of '{input_file_path}'")
+                    continue
 
-    if stored_timestamp is None or stored_timestamp != current_timestamp:
-        return True
-    else:
+            if segment.events and command_name and not is_trivial_command(command_name, trivial_commands):
+                open_segment = generate_filename(clean_filename(command_name), part_index)
+                span = segment.commit(open_segment)
+                if transcript:
+                    write_transcript(text_dir, open_segment, transcript.lines())
+                segments.append((open_segment, timestamp, span))
+        finally:
+            segment.discard()
+
+        size = reader.position
+
+    new_checkpoint = {
+        'size': size,
+        'fingerprint': file_fingerprint(input_file_path, size),
+        'offset': segment_offset,
+        'part_index': part_index,
+        'open_segment': open_segment,
+        'resumed_from': checkpoint['offset'] if checkpoint else None,
+    }
+    return segments, new_checkpoint
+
+def open_recording(input_file_path, checkpoint=None):
+    """Header line, start offset and a reader positioned at the checkpoint."""
+    with castio.CastReader(input_file_path) as header_reader:
+        json_line = header_reader.header_line
+        segment_offset = header_reader.position
+    if checkpoint:
+        segment_offset = checkpoint['offset']
+    return json_line, segment_offset, castio.CastReader(input_file_path, offset=segment_offset)
+
+def has_markers(input_file_path):
+    """True if the recording was made with configure.sh's command markers."""
+    try:
+        with open(input_file_path, 'rb') as f:
+            return MARKER_PREFIX.search(f.read(MARKER_PEEK_BYTES)) is not None
+    except OSError:
         return False
 
-def update_mapping_file(file_path, mapping_file):
+def parse_marker_command(fields):
+    """(command, start time) from the fields of a C marker."""
+    fields = fields.split(b';')[1:]
+    try:
+        command = base64.b64decode(fields[0]).decode('utf-8', 'replace')
+    except (IndexError, binascii.Error):
+        return None, None
     try:
-        with open(mapping_file, 'r') as f:
-            mapping = json.load(f)
-    except FileNotFoundError:
-        mapping = {}
+        started = float(fields[1])
+    except (IndexError, ValueError):
+        started = None
+    return prompts.normalize_command(command), started
+
+def process_marked_cast_file(input_file_path, output_dir, checkpoint=None, virtual=False):
+    """process_cast_file for recordings with OSC 133 prompt markers."""
+    segments = []
+    try:
+        json_line, segment_offset, reader = open_recording(input_file_path, checkpoint)
+    except IOError as e:
+        print(f"Error: Could not read file '{input_file_path}'. {e}")
+        return segments, None
 
-    mapping[file_path] = os.path.getmtime(file_path)
+    with reader:
+        part_index = checkpoint['part_index'] if checkpoint else 0
+        open_segment = None
+        segment = new_segment_writer(input_file_path, output_dir, json_line, reader, checkpoint, virtual)
+        start_time = None
+        command_name = None
+        timestamp = None
 
-    with open(mapping_file, 'w') as f:
-        json.dump(mapping, f, indent=4)
+        try:
+            for event in reader:
+                raw = event.raw
+                markers = MARKER.findall(raw) if MARKER_PREFIX.search(raw) else ()
+                cut = False
+                for kind, fields in markers:
+                    if kind == b'A' and not cut:
+                        if segment.events and command_name and not is_trivial_command(command_name, TRIVIAL_COMMANDS):
+                            name = generate_filename(clean_filename(command_name), part_index)
+                            segments.append((name, timestamp, segment.commit(name)))
+                            part_index += 1
+                        else:
+                            segment.discard()
+                        command_name = None
+                        timestamp = None
+                        start_time = None
+                        segment_offset = event.offset
+                        cut = True
+                    elif kind == b'C':
+                        command_name, started = parse_marker_command(fields)
+                        if started is not None:
+                            timestamp = time.strftime('%Y-%m-%d %H:%M:%S %Z', time.localtime(started))
 
+                try:
+                    data = event.record
+                    event_time = float(data[0])
+                except (ValueError, TypeError, IndexError):
+                    print(f"Error processing section of '{input_file_path}'")
+                    continue
+                if start_time is None:
+                    start_time = event_time
+                segment.write(event, [event_time - start_time, data[1], data[2]])
+
+            if segment.events and command_name and not is_trivial_command(command_name, TRIVIAL_COMMANDS):
+                open_segment = generate_filename(clean_filename(command_name), part_index)
+                segments.append((open_segment, timestamp, segment.commit(open_segment)))
+        finally:
+            segment.discard()
+
+        size = reader.position
+
+    new_checkpoint = {
+        'size': size,
+        'fingerprint': file_fingerprint(input_file_path, size),
+        'offset': segment_offset,
+        'part_index': part_index,
+        'open_segment': open_segment,
+        'resumed_from': checkpoint['offset'] if checkpoint else None,
+    }
+    return segments, new_checkpoint
 
 def extract_plain_text(display):
     return "\n".join(line.rstrip() for line in display)
 
-def adjust_time(line, start_time):
-    parts = json.loads(line.strip())
-    original_time = float(parts[0])
-    return original_time, parts[1], parts[2]
-
-def write_segment(filename, content, timestamp):
-    with open(filename, 'w') as new_file:
-        new_file.write('\n'.join(content))
-    if args.debug:
-        print(f"Created file: {filename}")
-
-    mapping_file = os.path.join(os.path.dirname(filename), 'file_timestamp_mapping.json')
+class SegmentWriter:
+    """Streams the segment being cut to a temp file that `commit` renames."""
+
+    def __init__(self, output_dir, header_line):
+        self.output_dir = output_dir
+        self.header_line = header_line
+        self.temp_path = os.path.join(output_dir, f".segment.{os.getpid()}.tmp")
+        self.writer = None
+        self.events = 0
+
+    def write(self, event, record):
+        if self.writer is None:
+            self.writer = castio.CastWriter(self.temp_path)
+            self.writer.write_raw(self.header_line)
+        self.writer.write(record)
+        self.events += 1
+
+    def commit(self, name):
+        filename = os.path.join(self.output_dir, name)
+        self.writer.close()
+        os.replace(self.temp_path, filename)
+        self.writer = None
+        self.events = 0
+        if args.debug:
+            print(f"Created file: {filename}")
+
+    def discard(self):
+        if self.writer is not None:
+            self.writer.discard()
+            os.remove(self.temp_path)
+        self.writer = None
+        self.events = 0
+
+class SegmentSpan:
+    """SegmentWriter for --virtual: records the segment's span instead of writing it."""
+
+    def __init__(self, input_file_path, reader, first_event=0):
+        self.input_file_path = input_file_path
+        self.reader = reader
+        self.first_event = first_event
+        self.span = None
+        self.events = 0
+
+    def write(self, event, record):
+        ordinal = self.first_event + self.reader.events_read - 1
+        if self.span is None:
+            self.span = {'start': event.offset, 'first_event': ordinal, 'time_offset': float(event.time)}
+        self.span['end'] = event.end
+        self.span['end_event'] = ordinal + 1
+        self.events += 1
+
+    def commit(self, name):
+        span = self.span
+        span['digest'] = castio.span_digest(self.input_file_path, span['start'], span['end'])
+        self.discard()
+        if args.debug:
+            print(f"Indexed segment: {name} (bytes {span['start']}-{span['end']})")
+        return span
+
+    def discard(self):
+        self.span = None
+        self.events = 0
+
+def new_segment_writer(input_file_path, output_dir, header_line, reader, checkpoint=None, virtual=False):
+    if not virtual:
+        return SegmentWriter(output_dir, header_line)
+    first_event = castio.count_events(input_file_path, checkpoint['offset']) if checkpoint else 0
+    return SegmentSpan(input_file_path, reader, first_event)
+
+class SegmentTranscript:
+    """The current segment replayed on a screen of its own."""
+
+    def __init__(self, columns, lines):
+        self.size = (columns, lines)
+        self.reset()
+
+    def reset(self):
+        self.screen = PatchedScreen(*self.size, history=SCROLLBACK_LINES)
+        self.stream = pyte.Stream(self.screen)
+        self.screen.reset()
+        self.pending = []
+
+    def feed(self, text):
+        self.pending.append(text)
+        if len(self.pending) >= FEED_BATCH:
+            self.stream.feed(''.join(self.pending))
+            self.pending = []
+
+    def lines(self):
+        self.stream.feed(''.join(self.pending))
+        self.pending = []
+        return [text for _, text in self.screen.history] + self.screen.display
+
+def write_transcript(text_dir, segment_name, lines):
+    os.makedirs(text_dir, exist_ok=True)
+    output_file = os.path.join(text_dir, os.path.splitext(segment_name)[0] + '.txt')
     try:
-        with open(mapping_file, 'r') as f:
-            mapping = json.load(f)
-    except FileNotFoundError:
-        mapping = {}
-
-    mapping[filename] = timestamp
-
-    with open(mapping_file, 'w') as f:
-        json.dump(mapping, f, indent=4)
+        with open(output_file, 'w') as file:
+            file.write("\n".join(lines))
+    except Exception as e:
+        print(f"Error writing to text file: {e}")
 
 def write_plain_text(filename, content):
     with open(filename, 'w') as text_file:
@@ -258,26 +792,15 @@ def write_plain_text(filename, content):
     print(f"Created plain text file: {filename}")
 
 def extract_command(display):
-    lines = display.split('\n')
-    for line in reversed(lines):
-        if '➜' in line:
-            command = line.split('➜')[-1].strip()
-            parts = command.split()
-            if parts:
-                if parts[0].startswith(('python3', 'sudo')):
-                    full_command = " ".join(parts[1:])
-                    return full_command.replace(' ', '_')
-            return command.replace(' ', '_')
-        elif '└─$' in line:
-            command = line.split('└─$')[-1].strip()
-            parts = command.split()
-            if parts:
-                if parts[0].startswith(('python3', 'sudo')):
-                    full_command = " ".join(parts[1:])
-                    return full_command.replace(' ', '_')
-            return command.replace(' ', '_')
+    for line in reversed(display.split('\n')):
+        command = extract_command_from_line(line)
+        if command is not None:
+            return command
     return "initial"
 
+def extract_command_from_line(line):
+    return DEFAULT_SCANNER.command(line)
+
 def clean_filename(command_name):
     command_name = re.sub(r'(-p\s+\S+)', '-p', command_name)
     command_name = re.sub(r'(-H\s+\S+)', '-H', command_name)
@@ -302,10 +825,45 @@ def generate_output_filename(command, output_dir):
 def is_trivial_command(command, trivial_commands):
     return command.split('_')[0] in trivial_commands
 
-if __name__ == "__main__":
+def load_prompt_patterns(path):
+    """Custom prompt regexes, one per line; blank lines and # comments are skipped."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def main():
+    global args
+    parser = argparse.ArgumentParser(description='Split CAST files')
+    parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of recordings to split in parallel (0 uses every core).')
+    parser.add_argument('-p', '--profile', action='append',
+                        help=f"Prompt profile to detect, repeatable ({', '.join(sorted(prompts.PROFILES))}; "
+                             f"default {' and '.join(prompts.DEFAULT_PROFILES)}).")
+    parser.add_argument('--prompt', action='append', default=[],
+                        help=f"Extra PS1 regex matched against screen lines, repeatable. "
+                             f"Patterns in {PROMPTS_FILE_NAME} are always added.")
+    parser.add_argument('--engine', choices=ENGINES, default='pyte',
+                        help='Emulator used to find prompts; vt is faster and leaves transcripts to pyte.')
+    parser.add_argument('--virtual', action='store_true',
+                        help='Index segments as byte ranges of the redacted recordings instead of copying them.')
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    custom_prompts = load_prompt_patterns(os.path.join(script_dir, PROMPTS_FILE_NAME)) + args.prompt
+    try:
+        profiles = prompts.resolve_profiles(args.profile, custom_prompts)
+    except (ValueError, re.error) as e:
+        parser.error(str(e))
     input_dir = os.path.join(script_dir, 'static', 'redacted_full')
     output_dir = os.path.join(script_dir, 'static', 'splits')
-    split_file(input_dir, output_dir, args.debug)
-    
+    text_dir = os.path.join(script_dir, 'static', 'text')
+    split_file(input_dir, output_dir, args.debug, text_dir, jobs, prompts.PromptScanner(profiles), args.virtual,
+               args.engine)
+
     create_text_versions()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import split
+from synthetic import write_cast
+
+
+@pytest.fixture(autouse=True)
+def split_args(monkeypatch):
+    monkeypatch.setattr(split, 'args', argparse.Namespace(debug=False), raising=False)
+
+
+@pytest.fixture
+def recording(tmp_path):
+    return write_cast(str(tmp_path / 'session.cast'), 3000)
@@ -0,0 +1,29 @@
+import pytest
+
+import castio
+
+
+@pytest.mark.parametrize('record', [
+    [0.5, 'o', 'café  \x1b[0m\x7f"\\ \t'],
+    [12.25, 'i', '\r'],
+    [1.5, 'o', 'lone \ud800 surrogate'],
+    {'version': 2, 'width': 80, 'height': 24, 'env': {'TERM': 'xterm-256color'}},
+])
+def test_backends_write_the_same_bytes(record):
+    assert castio.dumpb(record) == castio._json_dumpb(record)
+    assert castio.loads(castio.dumpb(record)) == record
+
+
+def test_atomic_writers_to_one_target_do_not_share_a_temp_file(tmp_path):
+    target = tmp_path / 'split.cast'
+    target.write_bytes(b'old\n')
+    target.chmod(0o640)
+    first, second = castio.CastWriter(str(target), atomic=True), castio.CastWriter(str(target), atomic=True)
+    first.write_raw(b'first')
+    second.write_raw(b'second')
+    first.close()
+    assert target.read_bytes() == b'first\n'
+    second.close()
+    assert target.read_bytes() == b'second\n'
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert [path.name for path in tmp_path.iterdir()] == ['split.cast']
@@ -0,0 +1,65 @@
+import json
+import os
+import sqlite3
+
+import catalog
+
+
+def test_legacy_mapping_and_favorites_are_migrated_once(tmp_path):
+    splits = tmp_path / 'static' / 'splits'
+    splits.mkdir(parents=True)
+    (splits / 'nmap_-sV_0.cast').write_text('{}\n')
+    (splits / catalog.LEGACY_MAPPING_NAME).write_text(json.dumps({
+        '2024-05-01.cast': 1714557600.5,
+        os.path.join('static', 'splits', 'nmap_-sV_0.cast'): '2024-05-01 10:00:00 UTC',
+        os.path.join('static', 'splits', 'hashcat_1.cast'): '2024-05-01 11:00:00 UTC',
+    }))
+    favorites = tmp_path / catalog.LEGACY_FAVORITES_NAME
+    favorites.write_text('hashcat_1.cast\n\n')
+
+    segment_catalog = catalog.open_catalog(str(splits))
+    assert segment_catalog.recording_mtime('2024-05-01.cast') == 1714557600.5
+    assert segment_catalog.segments(by_timestamp=True) == ['nmap_-sV_0.cast', 'hashcat_1.cast']
+    assert segment_catalog.timestamp('hashcat_1.cast') == '2024-05-01 11:00:00 UTC'
+    assert segment_catalog.tools() == ['hashcat', 'nmap']
+    assert segment_catalog.favorites() == {'hashcat_1.cast': True}
+    segment_catalog.remove_favorite('hashcat_1.cast')
+    segment_catalog.close()
+
+    segment_catalog = catalog.open_catalog(str(splits))
+    assert segment_catalog.favorites() == {}
+    segment_catalog.close()
+
+
+def test_sync_picks_up_files_added_or_removed_on_disk(tmp_path):
+    splits = tmp_path / 'splits'
+    segment_catalog = catalog.open_catalog(str(splits))
+    segment_catalog.record_recording('2024-05-01.cast', 1.0, [('nmap_0.cast', '2024-05-01 10:00:00 UTC', 10)])
+    (splits / 'nmap_0.cast').write_text('{}\n')
+    segment_catalog.sync(str(splits))
+    assert segment_catalog.segments() == ['nmap_0.cast']
+
+    (splits / 'nmap_0.cast').unlink()
+    (splits / 'gobuster_1.cast').write_text('{}\n')
+    segment_catalog.sync(str(splits))
+    assert segment_catalog.segments() == ['gobuster_1.cast']
+    assert segment_catalog.tools() == ['gobuster']
+    segment_catalog.close()
+
+
+def test_catalogs_from_before_virtual_segment_digests_are_upgraded(tmp_path):
+    path = tmp_path / catalog.CATALOG_NAME
+    conn = sqlite3.connect(str(path))
+    conn.execute('CREATE TABLE virtual_segments (name TEXT PRIMARY KEY, recording TEXT NOT NULL, '
+                 'start INTEGER NOT NULL, end INTEGER NOT NULL, first_event INTEGER NOT NULL, '
+                 'end_event INTEGER NOT NULL, time_offset REAL NOT NULL, source_mtime REAL NOT NULL)')
+    conn.execute("INSERT INTO virtual_segments VALUES ('nmap_0.cast', 'r.cast', 10, 20, 1, 3, 0.5, 1.0)")
+    conn.commit()
+    conn.close()
+
+    segment_catalog = catalog.Catalog(str(path))
+    assert segment_catalog.virtual_segment('nmap_0.cast')['digest'] is None
+    segment_catalog.record_recording('r.cast', 2.0, [('nmap_0.cast', None, 10)], spans={'nmap_0.cast': {
+        'start': 10, 'end': 20, 'first_event': 1, 'end_event': 3, 'time_offset': 0.5, 'digest': 'abc'}})
+    assert segment_catalog.virtual_segment('nmap_0.cast')['digest'] == 'abc'
+    segment_catalog.close()
@@ -0,0 +1,153 @@
+import json
+import shutil
+
+import pyte
+import pytest
+
+import castio
+import edit
+from synthetic import write_cast
+
+SPECS = ['drop-input', 'quantize:0.5,2:2,5', 'idle:1', 'cut:10,20', 'speed:2', 'trim:3,200', 'coalesce']
+
+
+def transform(transformation, source, target, streaming=True):
+    transformer = edit.StreamingTransformer if streaming else edit.Transformer
+    assert transformer(transformation, str(source), str(target), True).transform() is not False
+
+
+def read_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f.read().splitlines()[1:]]
+
+
+def test_chain_matches_each_transformation_in_turn(tmp_path, recording):
+    chained, stepped = tmp_path / 'chained.cast', tmp_path / 'stepped.cast'
+    transform(edit.parse_transformations(SPECS, True), recording, chained)
+    shutil.copy(recording, stepped)
+    for spec in SPECS:
+        transform(edit.parse_transformation(spec, True), stepped, stepped)
+    assert chained.read_bytes() == stepped.read_bytes()
+
+
+@pytest.mark.parametrize('spec', ['quantize:0.5,2:2,5', 'idle:1', 'speed:2', 'trim:3,200', 'cut:10,20'])
+def test_streaming_matches_in_memory_transform(tmp_path, recording, spec):
+    streamed, loaded = tmp_path / 'streamed.cast', tmp_path / 'loaded.cast'
+    transformation = edit.parse_transformation(spec, True)
+    transform(transformation, recording, streamed)
+    transform(transformation, recording, loaded, streaming=False)
+    assert streamed.read_bytes() == loaded.read_bytes()
+
+
+def test_cut_collapses_output_to_the_cut_start(tmp_path, recording):
+    output = tmp_path / 'cut.cast'
+    transform(edit.parse_transformation('cut:10,20', True), recording, output)
+    before = read_events(recording)
+    after = read_events(output)
+    kept = [event for event in before if not (10 <= event[0] < 20 and event[1] == 'i')]
+    assert [event[1:] for event in after] == [event[1:] for event in kept]
+    for old, new in zip(kept, after):
+        if 10 <= old[0] < 20:
+            assert new[0] == pytest.approx(10)
+        elif old[0] >= 20:
+            assert new[0] == pytest.approx(old[0] - 10)
+
+
+def test_transformed_lines_match_a_transformed_file(tmp_path, recording):
+    output = tmp_path / 'quantized.cast'
+    transformation = edit.parse_transformations(edit.DEFAULT_TRANSFORMS, True)
+    transform(transformation, recording, output)
+    with open(recording, 'rb') as f:
+        lines = f.read().splitlines()
+    assert [castio.loads(line) for line in edit.transform_lines(transformation, lines)][1:] == \
+        [castio.loads(line) for line in output.read_bytes().splitlines()][1:]
+
+
+def test_quantize_action_never_applies_a_step_twice(tmp_path, recording):
+    splits = tmp_path / 'static' / 'splits'
+    splits.mkdir(parents=True)
+    split = splits / 'session.cast'
+    shutil.copy(recording, split)
+    speed = edit.parse_transformations(['speed:2'], True)
+    for transformation in (speed, None, speed, None):
+        edit.quantize_action(str(tmp_path), False, transformation=transformation)
+
+    expected = tmp_path / 'expected.cast'
+    transform(speed, recording, expected)
+    transform(edit.parse_transformations(edit.DEFAULT_TRANSFORMS, True), expected, expected)
+    assert split.read_bytes() == expected.read_bytes()
+
+
+HEADER = '{"version": 2, "width": 80, "height": 24}'
+
+
+@pytest.mark.parametrize('lines', [
+    ['{"version": 1, "width": 80, "height": 24}', '[0.5, "o", "a"]'],
+    ['not json', '[0.5, "o", "a"]'],
+    [HEADER, '[0.5, "o", "a"]', '[0.25, "o", "b"]'],
+    [HEADER, '[0.5, "o", "a"]', '[1.0, "x", "b"]'],
+    [HEADER, '[0.5, "o", "a"]', '[1.0, "o"'],
+    [HEADER],
+])
+def test_invalid_casts_are_rejected_without_touching_the_file(tmp_path, lines):
+    path = tmp_path / 'split.cast'
+    path.write_text('\n'.join(lines) + '\n')
+    original = path.read_bytes()
+    transformation = edit.parse_transformations(edit.DEFAULT_TRANSFORMS, True)
+    assert edit.StreamingTransformer(transformation, str(path), str(path), False).transform() is False
+    with pytest.raises(edit.ValidationError):
+        edit.StreamingTransformer(transformation, str(path), str(path), True).transform()
+    assert path.read_bytes() == original
+    assert [child.name for child in tmp_path.iterdir()] == ['split.cast']
+
+
+def test_quantize_action_only_rewrites_new_splits_and_matches_across_jobs(tmp_path):
+    results = {}
+    for jobs in (1, 2):
+        splits = tmp_path / str(jobs) / 'static' / 'splits'
+        splits.mkdir(parents=True)
+        for seed in range(3):
+            write_cast(str(splits / f'nmap_{seed}.cast'), 300, seed=seed)
+        edit.quantize_action(str(tmp_path / str(jobs)), False, jobs=jobs)
+        results[jobs] = {path.name: path.read_bytes() for path in splits.glob('*.cast')}
+
+        mtimes = {path.name: path.stat().st_mtime_ns for path in splits.glob('*.cast')}
+        edit.quantize_action(str(tmp_path / str(jobs)), False, jobs=jobs)
+        assert {path.name: path.stat().st_mtime_ns for path in splits.glob('*.cast')} == mtimes
+
+        write_cast(str(splits / 'nmap_1.cast'), 300, seed=1)
+        edit.quantize_action(str(tmp_path / str(jobs)), False, jobs=jobs)
+        assert (splits / 'nmap_1.cast').read_bytes() == results[jobs]['nmap_1.cast']
+        assert {name: mtime for name, mtime in mtimes.items() if name != 'nmap_1.cast'} == \
+            {path.name: path.stat().st_mtime_ns for path in splits.glob('*.cast') if path.name != 'nmap_1.cast'}
+    assert results[2] == results[1]
+
+
+def screens_at(records, times, columns=80, lines=24):
+    """Display after the events of `records` up to each of `times`."""
+    screen = pyte.Screen(columns, lines)
+    stream = pyte.Stream(screen)
+    records = iter(records)
+    pending = next(records, None)
+    displays = []
+    for time in times:
+        while pending is not None and pending[0] <= time:
+            if pending[1] == 'o':
+                stream.feed(pending[2])
+            pending = next(records, None)
+        displays.append(screen.display)
+    return displays
+
+
+def test_coalesce_is_opt_in_and_renders_each_frame_the_same(tmp_path):
+    recording = write_cast(str(tmp_path / 'session.cast'), 800, width=80, height=24)
+    assert not any(isinstance(step, edit.CoalesceTransformation)
+                   for step in edit.transformation_steps(edit.parse_transformations(edit.DEFAULT_TRANSFORMS, True)))
+
+    output = tmp_path / 'coalesced.cast'
+    transform(edit.parse_transformation('coalesce', True), recording, output)
+    before, after = read_events(recording), read_events(output)
+    assert len(after) < len(before)
+    assert [event for event in after if event[1] == 'i'] == [event for event in before if event[1] == 'i']
+    frame_ends = sorted({event[0] for event in after})
+    assert screens_at(after, frame_ends) == screens_at(before, frame_ends)
@@ -0,0 +1,241 @@
+import base64
+import json
+import os
+
+import pytest
+
+import redact
+import split
+
+SECRET = 'hunter2swordfish'
+TEXT = ('$ mysql -u root -p s3cr3tpass -H "Authorization: Bearer abc" db\r\n'
+        f'login: {SECRET}\r\n\x1b[32mok\x1b[0m {SECRET} '
+        'aad3b435b51404eeaad3b435b51404ee:31d6cfe0d16ae931b73c59d7e0c089c0\r\n') * 20
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 16, 61])
+@pytest.mark.parametrize('window', [80, 256])
+def test_streaming_matches_whole_text_across_event_boundaries(size, window):
+    redactor = redact.Redactor(words=[SECRET])
+    streamer = redact.StreamingRedactor(redactor, window=window)
+    released = []
+    for index, text in enumerate(chunks(TEXT, size)):
+        released += streamer.feed([index * 0.1, 'o', text])
+        if index % 5 == 0:
+            released += streamer.feed([index * 0.1, 'i', 'x'])
+    released += streamer.flush()
+    output = ''.join(record[2] for record in released if record[1] == 'o')
+    assert output == redactor.redact(TEXT)
+    assert SECRET not in output
+    assert [record[0] for record in released] == sorted(record[0] for record in released)
+
+
+def test_cast_file_masks_secret_split_across_events(tmp_path):
+    source, target = tmp_path / 'in.cast', tmp_path / 'out.cast'
+    with open(source, 'w') as f:
+        f.write(json.dumps({'version': 2, 'width': 80, 'height': 24}) + '\n')
+        for index, text in enumerate(chunks(TEXT, 5)):
+            f.write(json.dumps([index * 0.01, 'o', text]) + '\n')
+    redacted = redact.process_cast_file(str(source), str(target), SECRET)
+    assert redacted > 0
+    with open(target) as f:
+        lines = f.read().splitlines()
+    output = ''.join(json.loads(line)[2] for line in lines[1:])
+    assert output == redact.get_redactor(SECRET).redact(TEXT)
+    assert len(lines) == len(chunks(TEXT, 5)) + 1
+
+
+def write_marked_cast(path, commands):
+    events, time = [], 0.0
+    for command in commands:
+        encoded = base64.b64encode(command.encode()).decode()
+        for text in ('\x1b]133;A\x07$ ', command + '\r\n', f'\x1b]133;C;{encoded};{1714557600 + int(time)}\x07',
+                     'done\r\n', '\x1b]133;D;0;1714557601\x07'):
+            time += 0.5
+            events.append([time, 'o', text])
+    with open(path, 'w') as f:
+        f.write(json.dumps({'version': 2, 'width': 80, 'height': 24}) + '\n')
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('detectors', [[], [redact.EntropyDetector()]])
+def test_command_markers_are_redacted_and_still_split(tmp_path, detectors):
+    commands = ['crackmapexec smb 10.0.0.1 -u admin -p Summer2024!', 'nmap -sV 10.0.0.1', 'whoami /all']
+    source = write_marked_cast(tmp_path / 'marked.cast', commands)
+    target = str(tmp_path / 'redacted.cast')
+    redact.process_cast_file(source, target, redactor=redact.Redactor(detectors=detectors))
+    with open(target, 'rb') as f:
+        data = f.read()
+    assert b'Summer2024!' not in data
+    assert base64.b64encode(commands[0].encode()) not in data
+    (tmp_path / 'plain').mkdir()
+    (tmp_path / 'masked').mkdir()
+    plain, _ = split.process_cast_file(source, str(tmp_path / 'plain'))
+    masked, _ = split.process_cast_file(target, str(tmp_path / 'masked'))
+    assert len(masked) == len(plain) == len(commands)
+    assert not any('Summer2024' in name for name, _, _ in masked)
+
+
+@pytest.mark.parametrize('words, text, expected', [
+    (['key a'], 'key aad3b435b51404eeaad3b435b51404ee:31d6cfe0d16ae931b73c59d7e0c089c0', '*' * 69),
+    (['H foo'], 'curl -H foobar', 'curl -********'),
+    (['ab', 'bcdef'], 'xabcdefx', 'x******x'),
+])
+def test_overlapping_matches_are_all_masked(words, text, expected):
+    assert redact.Redactor(words=words).redact(text) == expected
+
+
+def write_cast(path, texts):
+    with open(path, 'w') as f:
+        f.write(json.dumps({'version': 2, 'width': 80, 'height': 24}) + '\n')
+        for index, text in enumerate(texts):
+            f.write(json.dumps([index * 0.01, 'o', text]) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('read_bytes', [64, 1 << 20])
+def test_follower_reads_in_bounded_chunks(tmp_path, monkeypatch, read_bytes):
+    source = write_cast(tmp_path / 'in.cast', chunks(TEXT, 5))
+    batch, followed = str(tmp_path / 'batch.cast'), str(tmp_path / 'followed.cast')
+    redactor = redact.Redactor(words=[SECRET])
+    redact.process_cast_file(source, batch, redactor=redactor)
+
+    monkeypatch.setattr(redact, 'FOLLOW_READ_BYTES', read_bytes)
+    follower = redact.RecordingFollower(source, followed, redactor)
+    read_lines = follower._read_lines
+    reads = []
+
+    def recorded_reads(size):
+        for data in read_lines(size):
+            reads.append(len(data))
+            yield data
+
+    monkeypatch.setattr(follower, '_read_lines', recorded_reads)
+    assert follower.poll(idle_flush=0)
+    assert follower.is_complete()
+    with open(source, 'rb') as f:
+        longest = max(len(line) for line in f)
+    assert max(reads) < read_bytes + longest
+    with open(batch, 'rb') as f, open(followed, 'rb') as g:
+        assert g.read() == f.read()
+
+
+def test_redact_directory_keeps_entries_recorded_meanwhile(tmp_path, monkeypatch):
+    full_dir, redacted_dir = tmp_path / 'full', tmp_path / 'redacted'
+    full_dir.mkdir()
+    redacted_dir.mkdir()
+    write_cast(full_dir / 'batch.cast', [f'login: {SECRET}\r\n'])
+    manifest_path = str(redacted_dir / redact.MANIFEST_NAME)
+    redact.save_manifest(manifest_path, {'gone.cast': {'rules': 'old'}})
+    redact_files = redact.redact_files
+
+    def redact_files_while_following(*args, **kwargs):
+        with redact.manifest_lock(manifest_path):
+            manifest = redact.load_manifest(manifest_path)
+            manifest['live.cast'] = {'rules': 'followed'}
+            redact.save_manifest(manifest_path, manifest)
+        return redact_files(*args, **kwargs)
+
+    monkeypatch.setattr(redact, 'redact_files', redact_files_while_following)
+    redact.redact_directory(str(full_dir), str(redacted_dir), redact.Redactor(words=[SECRET]))
+    assert sorted(redact.load_manifest(manifest_path)) == ['batch.cast', 'live.cast']
+
+
+def write_recordings(full_dir, count):
+    full_dir.mkdir()
+    for index in range(count):
+        write_cast(full_dir / f'{index:02d}.cast', chunks(TEXT[index:], 7 + index))
+
+
+def test_parallel_redaction_matches_a_single_process(tmp_path):
+    full_dir = tmp_path / 'full'
+    write_recordings(full_dir, 4)
+    redactor = redact.Redactor(words=[SECRET])
+    outputs = {}
+    for jobs in (1, 3):
+        redacted_dir = tmp_path / f'redacted{jobs}'
+        results, failed = redact.redact_directory(str(full_dir), str(redacted_dir), redactor, jobs=jobs)
+        assert not failed and len(results) == 4
+        outputs[jobs] = {path.name: path.read_bytes() for path in redacted_dir.glob('*.cast')}
+    assert outputs[3] == outputs[1]
+    assert not any(SECRET.encode() in data for data in outputs[3].values())
+
+
+def test_parallel_progress_counts_every_file_once(tmp_path):
+    full_dir = tmp_path / 'full'
+    write_recordings(full_dir, 4)
+    tasks = [(str(path), str(tmp_path / path.name)) for path in sorted(full_dir.iterdir())]
+    progress = []
+    results, failed = redact.redact_files(tasks + [(str(tmp_path / 'missing.cast'), str(tmp_path / 'x.cast'))],
+                                          redact.Redactor(), jobs=2,
+                                          progress=lambda done, total: progress.append((done, total)))
+    assert sorted(results) == tasks
+    assert [task for task, _ in failed] == [(str(tmp_path / 'missing.cast'), str(tmp_path / 'x.cast'))]
+    assert progress == [(done, 5) for done in range(1, 6)]
+
+
+def test_manifest_redacts_only_changed_files_and_rule_changes(tmp_path):
+    full_dir, redacted_dir = tmp_path / 'full', tmp_path / 'redacted'
+    write_recordings(full_dir, 3)
+    redactor = redact.Redactor(words=[SECRET])
+    assert len(redact.redact_directory(str(full_dir), str(redacted_dir), redactor)[0]) == 3
+    assert redact.redact_directory(str(full_dir), str(redacted_dir), redactor) == ({}, [])
+
+    touched, edited = full_dir / '00.cast', full_dir / '01.cast'
+    os.utime(touched)
+    edited.write_bytes(edited.read_bytes() + json.dumps([99.0, 'o', 'more']).encode() + b'\n')
+    results, _ = redact.redact_directory(str(full_dir), str(redacted_dir), redactor)
+    assert [os.path.basename(input_path) for input_path, _ in results] == ['01.cast']
+    assert redact.redact_directory(str(full_dir), str(redacted_dir), redactor) == ({}, [])
+
+    (full_dir / '02.cast').unlink()
+    results, _ = redact.redact_directory(str(full_dir), str(redacted_dir), redact.Redactor(words=[SECRET, 'login']))
+    assert len(results) == 2
+    assert sorted(redact.load_manifest(str(redacted_dir / redact.MANIFEST_NAME))) == ['00.cast', '01.cast']
+
+
+def test_added_word_reaches_only_the_files_that_contain_it(tmp_path):
+    static = tmp_path / 'static'
+    for subdir in ('splits', 'redacted_full', 'text'):
+        (static / subdir).mkdir(parents=True)
+    word = 'client-dc01.corp.local'
+    write_cast(static / 'splits' / 'nmap_0.cast', [f'Nmap scan report for {word}\r\n'])
+    write_cast(static / 'splits' / 'whoami_1.cast', ['kali\r\n'])
+    write_cast(static / 'redacted_full' / 'session.cast', ['kali\r\n', f'ping {word}\r\n'])
+    (static / 'text' / 'nmap_0.txt').write_text(f'Nmap scan report for {word}\n')
+    untouched = static / 'splits' / 'whoami_1.cast'
+    mtime = untouched.stat().st_mtime_ns
+    manifest_path = str(static / 'redacted_full' / redact.MANIFEST_NAME)
+    redact.save_manifest(manifest_path, {'session.cast': {'rules': redact.Redactor().fingerprint}})
+
+    rewritten, failed = redact.add_redaction_word(word, str(tmp_path), jobs=1)
+    assert not failed
+    assert sorted(os.path.relpath(path, static) for path in rewritten) == [
+        os.path.join('redacted_full', 'session.cast'), os.path.join('splits', 'nmap_0.cast'),
+        os.path.join('text', 'nmap_0.txt')]
+    assert not any(word in path.read_text() for path in static.rglob('*.*') if path.suffix in ('.cast', '.txt'))
+    assert untouched.stat().st_mtime_ns == mtime
+    assert redact.load_redaction_words(str(tmp_path / redact.WORDS_FILE_NAME)) == [word]
+    assert redact.load_manifest(manifest_path)['session.cast']['rules'] == redact.Redactor(words=[word]).fingerprint
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('echo dGhpcyBpcyBhIHNlY3JldCBibG9iIGZvciB0ZXN0aW5n | base64 -d',
+     'echo ******************************************** | base64 -d'),
+    ('curl "http://10.0.0.5/?token=eyJhbGciOiJIUzI1NiJ9abc123XYZ"',
+     'curl "http://10.0.0.5/?token=*****************************"'),
+    ('Administrator:500:aad3b435b51404eeaad3b435b51404ee:::',
+     'Administrator:500:********************************:::'),
+    ('cat /usr/share/wordlists/seclists/Discovery/Web-Content/common.txt', None),
+    ('ssh admin@ip-10-0-0-12.eu-west-1.compute.internal', None),
+    ('apt install linux-image-6.1.0-kali9-amd64 supercalifragilisticexpialidocious', None),
+])
+def test_entropy_detector_masks_secrets_but_not_names(text, expected):
+    assert redact.Redactor(rules=[], detectors=[redact.EntropyDetector()]).redact(text) == (expected or text)
+    assert redact.Redactor(rules=[]).redact(text) == text
@@ -0,0 +1,131 @@
+import os
+
+import castio
+import catalog
+import split
+from synthetic import write_cast
+
+# Segment commands the original full-screen splitter produced for a 120x40
+# tool recording (seed 5, 2400 events), one letter per segment in order.
+BASELINE_COMMANDS = {
+    'A': 'apt_install__y_crackmapexec',
+    'H': 'hashcat__m_1000_hashes_txt',
+    'L': 'less__var_log_auth_log',
+    'N': 'nmap__sV_10_0_0_1',
+    'X': 'nmap__sV_10_0_0_1h_log',
+}
+BASELINE_SEGMENTS = 'HHHHNHHLAAHHHNNNNNHNHHHHHHNHHHNNNHHLXX'
+
+
+def test_transcripts_match_a_replay_of_each_segment(tmp_path, recording):
+    output_dir, text_dir = tmp_path / 'splits', tmp_path / 'text'
+    output_dir.mkdir()
+    segments, _ = split.process_cast_file(recording, str(output_dir), str(text_dir))
+    assert len(segments) > 5
+    for name, _, _ in segments:
+        transcript = (text_dir / (os.path.splitext(name)[0] + '.txt')).read_text()
+        replay = split.process_with_terminal_emulator(str(output_dir / name), str(tmp_path / 'replay.txt'))
+        assert transcript == replay, name
+
+
+def split_files(directory):
+    return {path.name: path.read_bytes() for path in directory.iterdir() if path.suffix in ('.cast', '.txt')}
+
+
+def test_resume_from_checkpoint_matches_a_full_split(tmp_path, recording):
+    full_dir, resumed_dir = tmp_path / 'full', tmp_path / 'resumed'
+    split._split_task(recording, str(full_dir), str(full_dir))
+
+    with open(recording, 'rb') as f:
+        lines = f.readlines()
+    grown = tmp_path / 'grown' / 'session.cast'
+    grown.parent.mkdir()
+    grown.write_bytes(b''.join(lines[:len(lines) // 2]))
+    _, _, checkpoint, _ = split._split_task(str(grown), str(resumed_dir), str(resumed_dir))
+    assert checkpoint['offset'] > 0
+
+    grown.write_bytes(b''.join(lines))
+    _, segments, _, stale = split._split_task(str(grown), str(resumed_dir), str(resumed_dir), checkpoint)
+    assert segments
+    if stale:
+        split.remove_segment(stale, str(resumed_dir), str(resumed_dir))
+    assert split_files(resumed_dir) == split_files(full_dir)
+
+
+
+def test_same_size_rewrite_of_the_middle_is_not_resumed(tmp_path, recording):
+    _, _, checkpoint, _ = split._split_task(recording, str(tmp_path / 'splits'), None)
+    with open(recording, 'r+b') as f:
+        data = f.read()
+        middle = data.index(b'"o"', len(data) // 2)
+        f.seek(middle)
+        f.write(b'"i"')
+    assert os.path.getsize(recording) == checkpoint['size']
+    assert not split.can_resume(recording, checkpoint)
+
+def test_virtual_segments_match_physical_splits(tmp_path, recording):
+    physical_dir, virtual_dir = tmp_path / 'physical', tmp_path / 'virtual'
+    physical_dir.mkdir()
+    virtual_dir.mkdir()
+    physical, _ = split.process_cast_file(recording, str(physical_dir))
+    virtual, _ = split.process_cast_file(recording, str(virtual_dir), virtual=True)
+    assert [name for name, _, _ in virtual] == [name for name, _, _ in physical]
+    assert not list(virtual_dir.iterdir())
+    for name, _, span in virtual:
+        lines = castio.segment_lines(recording, span['start'], span['end'], span['time_offset'])
+        assert b''.join(line + b'\n' for line in lines) == (physical_dir / name).read_bytes(), name
+
+
+def test_segment_names_match_the_original_splitter(tmp_path):
+    recording = write_cast(str(tmp_path / 'session.cast'), 2400, seed=5, width=120, height=40, tools=True)
+    segments, _ = split.process_cast_file(recording, str(tmp_path))
+    assert [name for name, _, _ in segments] == [
+        split.generate_filename(BASELINE_COMMANDS[letter], index)
+        for index, letter in enumerate(BASELINE_SEGMENTS)]
+
+
+def test_untracked_or_outdated_transcripts_are_rebuilt(tmp_path, recording):
+    text = tmp_path / 'session.txt'
+    text.write_text('a 49-row screen from an older split\n')
+    entry = split.refresh_transcript('session.cast', recording, str(text), {})
+    assert entry == ('session.cast', split.transcript_fingerprint(recording))
+    rendered = text.read_text()
+    assert rendered == split.process_with_terminal_emulator(recording, str(tmp_path / 'replay.txt'))
+
+    assert split.refresh_transcript('session.cast', recording, str(text), dict([entry])) is None
+    text.write_text('stale')
+    assert split.refresh_transcript('session.cast', recording, str(text), {'session.cast': 'a' * 32}) == entry
+    assert text.read_text() == rendered
+
+
+def test_split_file_records_in_pass_transcripts(tmp_path, monkeypatch, recording):
+    monkeypatch.chdir(tmp_path)
+    output_dir, text_dir = tmp_path / 'splits', tmp_path / 'text'
+    split.split_file(os.path.dirname(recording), str(output_dir), text_dir=str(text_dir))
+    segment_catalog = catalog.open_catalog(str(output_dir))
+    fingerprints = segment_catalog.transcripts()
+    segment_catalog.close()
+    names = [path.name for path in output_dir.glob('*.cast')]
+    assert names and set(fingerprints) == set(names)
+    for name in names:
+        output_file = str(text_dir / (os.path.splitext(name)[0] + '.txt'))
+        assert split.refresh_transcript(name, str(output_dir / name), output_file, fingerprints) is None
+
+
+def test_parallel_split_matches_a_single_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_dir = tmp_path / 'full'
+    input_dir.mkdir()
+    for seed in range(3):
+        write_cast(str(input_dir / f'2024-05-0{seed + 1}.cast'), 600, seed=seed, tools=True)
+    results = {}
+    for jobs in (1, 2):
+        output_dir, text_dir = tmp_path / f'splits{jobs}', tmp_path / f'text{jobs}'
+        split.split_file(str(input_dir), str(output_dir), text_dir=str(text_dir), jobs=jobs)
+        segment_catalog = catalog.open_catalog(str(output_dir))
+        results[jobs] = (split_files(output_dir), split_files(text_dir),
+                         [(name, segment_catalog.timestamp(name)) for name in segment_catalog.segments()])
+        segment_catalog.close()
+        assert not (output_dir / split.STAGING_DIR).exists() or not any((output_dir / split.STAGING_DIR).iterdir())
+    assert results[2] == results[1]
+    assert len(results[1][0]) > 3
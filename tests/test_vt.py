@@ -0,0 +1,65 @@
+import glob
+import os
+
+import pyte
+import pytest
+
+import castio
+import split
+import vt
+from synthetic import write_cast
+
+RECORDINGS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                           'static', 'full', '*.cast')))
+
+
+def assert_same_rows(events, columns, lines, render=True):
+    """Feed `events` to pyte and vt and compare every row and the cursor.
+
+    With `render`, dirty rows are rendered and compared after each event as
+    split.DisplayTracker does; rendering adds rows to pyte's buffer, which
+    changes what delete_lines leaves behind, so both ways are checked.
+    """
+    reference = split.PatchedScreen(columns, lines)
+    stream = pyte.Stream(reference)
+    reference.reset()
+    screen = vt.Screen(columns, lines)
+    for index, data in enumerate(events):
+        for feed in (stream.feed, screen.feed):
+            try:
+                feed(data)
+            except Exception:
+                pass
+        if not render:
+            continue
+        dirty = sorted(y for y in reference.dirty | screen.dirty if y < lines)
+        reference.dirty.clear()
+        screen.dirty.clear()
+        rows = [(split.render_line(reference, y), screen.render_line(y)) for y in dirty]
+        assert all(expected == actual for expected, actual in rows), (index, data)
+        assert (reference.cursor.x, reference.cursor.y) == (screen.cursor.x, screen.cursor.y), (index, data)
+    assert [split.render_line(reference, y) for y in range(lines)] == screen.display
+
+
+@pytest.mark.parametrize('render', [True, False])
+@pytest.mark.parametrize('path', RECORDINGS or [None])
+def test_recordings_render_like_pyte(tmp_path, path, render):
+    if path is None:
+        path = write_cast(str(tmp_path / 'tools.cast'), 3000, width=80, height=24, tools=True)
+    with castio.CastReader(path) as reader:
+        columns, lines = split.screen_size(reader.header)
+        events = [record[2] for record in reader.records() if isinstance(record, list) and len(record) > 2]
+    assert_same_rows(events, columns, lines, render)
+
+
+@pytest.mark.parametrize('render', [True, False])
+@pytest.mark.parametrize('events', [
+    ['ab', '\x1b[M'],
+    ['中文中文中文中文中', '\x1b[3M'],
+    ['x' * 30, '\x1b[2;5r\x1b[?6h', '\x1b[L', '\x1b[2;5r\x1b[M'],
+    ['\x1b[5;3Hé\x1b8', '\x1bD\x1b[M', '\x1b[3M'],
+    ['\x1b[19G😀x', '\x1b[M'],
+    ['\x1b7\x1b[0;9r\x1b8\x1b[1A', 'line\r\n', '\x1b7\x1b[10;0fProgress\x1b8', '\x1b[L\x1b[M'],
+])
+def test_edge_cases_render_like_pyte(events, render):
+    assert_same_rows(events, 20, 10, render)
@@ -0,0 +1,653 @@
+import re
+import unicodedata
+
+from wcwidth import wcwidth
+
+# A minimal VT100 screen for finding prompts and commands while splitting.
+#
+# split.py only needs the text of the rows a prompt may be on, so unlike
+# pyte this keeps one string per cell and no attributes: colours, titles
+# and charsets are parsed and dropped. Rows, the cursor and scrolling
+# follow pyte's rules (and its quirks) for every control it dispatches, so
+# both engines see the same prompt lines and cut recordings in the same
+# places. Transcripts are still rendered with pyte.
+#
+# Tracking only the prompt line is not enough: the command name is taken
+# from the bottom-most prompt on screen, and full-screen tools (less, top,
+# hashcat's status view) move earlier prompts with margins, inserted and
+# deleted lines and scrolling. Dropping any of those controls renames or
+# moves segment boundaries, so they all stay.
+#
+# Input is tokenized with regexes: runs of text are drawn in one go and
+# complete CSI/OSC sequences dispatched directly. Anything else, including
+# a sequence split across two events, goes through a per-character state
+# machine equivalent to pyte.Stream's.
+#
+# Known divergence from pyte: with origin mode set and no margins, CSI d
+# makes pyte fail an assertion after it moved the cursor below the screen;
+# pyte keeps drawing there unseen while this screen drops the rest of the
+# event. tests/test_vt.py checks every other row against pyte.
+
+ESC = '\x1b'
+CSI_C1 = '\x9b'
+OSC_C1 = '\x9d'
+ST_C1 = '\x9c'
+BEL = '\x07'
+NUL_OR_DEL = '\x00\x7f'
+CAN_OR_SUB = '\x18\x1a'
+ALLOWED_IN_CSI = '\x07\x08\x09\x0a\x0b\x0c\x0d'
+
+TEXT = re.compile('[^\x00\x07-\x0f\x1b\x7f\x9b\x9d]+')
+CSI = re.compile(r'(?:\x1b\[|\x9b)(\??)([0-9;]*)([@-~])')
+OSC = re.compile(r'(?:\x1b\]|\x9d)[^RP][^\x07\x1b\x9c]*(?:\x07|\x9c|\x1b\\)')
+
+# pyte.modes: private modes are shifted left by 5.
+LNM = 20
+IRM = 4
+DECCOLM = 3 << 5
+DECOM = 6 << 5
+DECAWM = 7 << 5
+DECTCEM = 25 << 5
+
+BASIC = {
+    '\x07': 'bell',
+    '\x08': 'backspace',
+    '\x09': 'tab',
+    '\x0a': 'linefeed',
+    '\x0b': 'linefeed',
+    '\x0c': 'linefeed',
+    '\x0d': 'carriage_return',
+}
+
+ESCAPES = {
+    'c': 'reset',
+    'D': 'index',
+    'E': 'linefeed',
+    'M': 'reverse_index',
+    'H': 'set_tab_stop',
+    '7': 'save_cursor',
+    '8': 'restore_cursor',
+}
+
+CSI_HANDLERS = {
+    '@': 'insert_characters',
+    'A': 'cursor_up',
+    'B': 'cursor_down',
+    'C': 'cursor_forward',
+    'D': 'cursor_back',
+    'E': 'cursor_down1',
+    'F': 'cursor_up1',
+    'G': 'cursor_to_column',
+    'H': 'cursor_position',
+    'J': 'erase_in_display',
+    'K': 'erase_in_line',
+    'L': 'insert_lines',
+    'M': 'delete_lines',
+    'P': 'delete_characters',
+    'X': 'erase_characters',
+    'a': 'cursor_forward',
+    'c': 'report_device_attributes',
+    'd': 'cursor_to_line',
+    'e': 'cursor_down',
+    'f': 'cursor_position',
+    'g': 'clear_tab_stop',
+    'h': 'set_mode',
+    'l': 'reset_mode',
+    'm': 'select_graphic_rendition',
+    'n': 'report_device_status',
+    'r': 'set_margins',
+    "'": 'cursor_to_column',
+}
+
+
+class Cursor:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+
+class Screen:
+    """Screen and stream in one: `feed` text, read rows with `render_line`.
+
+    Exposes what split.DisplayTracker uses from a PatchedScreen: `lines`,
+    `columns`, `cursor`, `dirty`, `scrolled` and `history` (always None).
+
+    Each row holds one cell more than the screen is wide: pyte can park a
+    character just past the right edge (inserting characters pushes one
+    there) and bring it back when characters are deleted.
+
+    `present` tracks which rows pyte's buffer (a defaultdict) holds a key
+    for: any access, rendering included, adds one. pyte's delete_lines only
+    moves a row up from a row that has a key and otherwise leaves the old
+    text in place, so this decides what DL inside margins leaves behind.
+    """
+
+    history = None
+
+    def __init__(self, columns, lines):
+        self.columns = columns
+        self.lines = lines
+        self.dirty = set()
+        self.savepoints = []
+        self.scrolled = 0
+        self._state = None
+        self._params = []
+        self._current = ''
+        self._private = False
+        self._basic = {char: getattr(self, name) for char, name in BASIC.items()}
+        self.reset()
+
+    @property
+    def display(self):
+        return [self.render_line(y) for y in range(self.lines)]
+
+    def render_line(self, y):
+        """Row `y` as split.render_line renders a pyte row: the cell after a
+        wide character is skipped whatever it holds."""
+        self.present[y] = True
+        cells = self.rows[y][:-1]
+        text = ''.join(cells)
+        if text.isascii():
+            return text
+        chars = []
+        is_wide_char = False
+        for char in cells:
+            if is_wide_char:
+                is_wide_char = False
+                continue
+            chars.append(char)
+            is_wide_char = bool(char) and wcwidth(char[0]) == 2
+        return ''.join(chars)
+
+    def _blank(self):
+        return [' '] * (self.columns + 1)
+
+    # Parsing
+
+    def feed(self, data):
+        """Parse `data`; like pyte, a handler error drops the rest of it."""
+        basic = self._basic
+        length = len(data)
+        offset = 0
+        try:
+            if self._state is not None:
+                offset = self._advance(data, offset)
+            while offset < length:
+                match = TEXT.match(data, offset)
+                if match is not None:
+                    self.draw(match.group())
+                    offset = match.end()
+                    continue
+                char = data[offset]
+                handler = basic.get(char)
+                if handler is not None:
+                    handler()
+                    offset += 1
+                    continue
+                if char == ESC or char == CSI_C1:
+                    match = CSI.match(data, offset)
+                    if match is not None:
+                        private, params, final = match.groups()
+                        self._dispatch_csi(final, [min(int(p or 0), 9999) for p in params.split(';')],
+                                           bool(private))
+                        offset = match.end()
+                        continue
+                    match = OSC.match(data, offset)
+                    if match is not None:
+                        offset = match.end()
+                        continue
+                offset = self._advance(data, offset)
+        except Exception:
+            self._state = None
+            raise
+
+    def _advance(self, data, offset):
+        """Feed characters one at a time until back in the ground state."""
+        length = len(data)
+        while offset < length:
+            self._step(data[offset])
+            offset += 1
+            if self._state is None:
+                break
+        return offset
+
+    def _step(self, char):
+        state = self._state
+        if state is None:
+            if char == ESC:
+                self._state = 'esc'
+            elif char == CSI_C1:
+                self._begin_csi()
+            elif char == OSC_C1:
+                self._state = 'osc_code'
+            elif char in BASIC:
+                self._basic[char]()
+            elif char not in NUL_OR_DEL and char not in '\x0e\x0f':
+                self.draw(char)
+        elif state == 'esc':
+            self._state = None
+            if char == '[':
+                self._begin_csi()
+            elif char == ']':
+                self._state = 'osc_code'
+            elif char == '#':
+                self._state = 'sharp'
+            elif char in '%()':
+                self._state = 'skip'
+            elif char in ESCAPES:
+                getattr(self, ESCAPES[char])()
+        elif state == 'csi':
+            if char == '?':
+                self._private = True
+            elif char in ALLOWED_IN_CSI:
+                self._basic[char]()
+            elif char in ' >':
+                pass
+            elif char in CAN_OR_SUB:
+                self._state = None
+                self.draw(char)
+            elif char.isdigit():
+                self._current += char
+            elif char == '$':
+                self._state = 'skip'
+            else:
+                self._params.append(min(int(self._current or 0), 9999))
+                if char == ';':
+                    self._current = ''
+                else:
+                    self._state = None
+                    self._dispatch_csi(char, self._params, self._private)
+        elif state == 'osc_code':
+            self._state = None if char in 'RP' else 'osc'
+        elif state == 'osc':
+            if char == ESC:
+                self._state = 'osc_esc'
+            elif char == BEL or char == ST_C1:
+                self._state = None
+        elif state == 'osc_esc':
+            self._state = None if char == '\\' else 'osc'
+        elif state == 'sharp':
+            self._state = None
+            if char == '8':
+                self.alignment_display()
+        else:
+            self._state = None
+
+    def _begin_csi(self):
+        self._state = 'csi'
+        self._params = []
+        self._current = ''
+        self._private = False
+
+    def _dispatch_csi(self, final, params, private):
+        name = CSI_HANDLERS.get(final)
+        if name is None:
+            return
+        if private:
+            getattr(self, name)(*params, private=True)
+        else:
+            getattr(self, name)(*params)
+
+    # Drawing
+
+    def draw(self, data):
+        cursor = self.cursor
+        if IRM in self.mode or not (data.isascii() and data.isprintable()):
+            return self._draw_slow(data)
+        columns = self.columns
+        autowrap = DECAWM in self.mode
+        offset = 0
+        length = len(data)
+        while offset < length:
+            if cursor.x == columns:
+                if not autowrap:
+                    self.present[cursor.y] = True
+                    self.rows[cursor.y][columns - 1] = data[-1]
+                    break
+                self.dirty.add(cursor.y)
+                self.carriage_return()
+                self.linefeed()
+            count = min(length - offset, columns - cursor.x)
+            self.present[cursor.y] = True
+            self.rows[cursor.y][cursor.x:cursor.x + count] = data[offset:offset + count]
+            cursor.x += count
+            offset += count
+        self.dirty.add(cursor.y)
+
+    def _draw_slow(self, data):
+        cursor = self.cursor
+        columns = self.columns
+        for char in data:
+            char_width = wcwidth(char)
+            if cursor.x == columns:
+                if DECAWM in self.mode:
+                    self.dirty.add(cursor.y)
+                    self.carriage_return()
+                    self.linefeed()
+                elif char_width > 0:
+                    cursor.x -= char_width
+            if IRM in self.mode and char_width > 0:
+                self.insert_characters(char_width)
+
+            row = self.rows[cursor.y]
+            self.present[cursor.y] = True
+            if char_width == 1:
+                row[cursor.x] = char
+            elif char_width == 2:
+                row[cursor.x] = char
+                if cursor.x + 1 < columns:
+                    row[cursor.x + 1] = ''
+            elif char_width == 0 and unicodedata.combining(char):
+                if cursor.x:
+                    row[cursor.x - 1] = unicodedata.normalize('NFC', row[cursor.x - 1] + char)
+                elif cursor.y:
+                    self.present[cursor.y - 1] = True
+                    above = self.rows[cursor.y - 1]
+                    above[columns - 1] = unicodedata.normalize('NFC', above[columns - 1] + char)
+            else:
+                break
+            if char_width > 0:
+                cursor.x = min(cursor.x + char_width, columns)
+        self.dirty.add(cursor.y)
+
+    # Screen state
+
+    def reset(self):
+        self.dirty.update(range(self.lines))
+        self.rows = [self._blank() for _ in range(self.lines)]
+        self.present = [False] * self.lines
+        self.margins = None
+        self.mode = {DECAWM, DECTCEM}
+        self.tabstops = set(range(8, self.columns, 8))
+        self.cursor = Cursor(0, 0)
+        self.cursor_position()
+        self.saved_columns = None
+
+    def resize(self, columns):
+        if columns == self.columns:
+            return
+        self.dirty.update(range(self.lines))
+        for row in self.rows:
+            if columns < self.columns:
+                row[columns:] = [' ']
+            else:
+                row.extend([' '] * (columns - self.columns))
+        self.columns = columns
+        self.set_margins()
+
+    def set_margins(self, top=None, bottom=None):
+        if (top is None or top == 0) and bottom is None:
+            self.margins = None
+            return
+        margins = self.margins or (0, self.lines - 1)
+        top = margins[0] if top is None else max(0, min(top - 1, self.lines - 1))
+        bottom = margins[1] if bottom is None else max(0, min(bottom - 1, self.lines - 1))
+        if bottom - top >= 1:
+            self.margins = (top, bottom)
+            self.cursor_position()
+
+    def set_mode(self, *modes, **kwargs):
+        if kwargs.get('private'):
+            modes = [mode << 5 for mode in modes]
+        self.mode.update(modes)
+        if DECCOLM in modes:
+            self.saved_columns = self.columns
+            self.resize(132)
+            self.erase_in_display(2)
+            self.cursor_position()
+        if DECOM in modes:
+            self.cursor_position()
+
+    def reset_mode(self, *modes, **kwargs):
+        if kwargs.get('private'):
+            modes = [mode << 5 for mode in modes]
+        self.mode.difference_update(modes)
+        if DECCOLM in modes:
+            if self.columns == 132 and self.saved_columns is not None:
+                self.resize(self.saved_columns)
+                self.saved_columns = None
+            self.erase_in_display(2)
+            self.cursor_position()
+        if DECOM in modes:
+            self.cursor_position()
+
+    def select_graphic_rendition(self, *attrs, private=False):
+        pass
+
+    def report_device_attributes(self, mode=0, **kwargs):
+        pass
+
+    def report_device_status(self, mode):
+        pass
+
+    def bell(self):
+        pass
+
+    def alignment_display(self):
+        self.dirty.update(range(self.lines))
+        self.present = [True] * self.lines
+        for row in self.rows:
+            row[:self.columns] = ['E'] * self.columns
+
+    # Cursor movement
+
+    def carriage_return(self):
+        self.cursor.x = 0
+
+    def index(self):
+        top, bottom = self.margins or (0, self.lines - 1)
+        if self.cursor.y == bottom:
+            self.scrolled += 1
+            self.dirty.update(range(self.lines))
+            del self.rows[top]
+            self.rows.insert(bottom, self._blank())
+            self.present[top:bottom + 1] = [True] * (bottom - top) + [False]
+        else:
+            self.cursor_down()
+
+    def reverse_index(self):
+        top, bottom = self.margins or (0, self.lines - 1)
+        if self.cursor.y == top:
+            self.dirty.update(range(self.lines))
+            del self.rows[bottom]
+            self.rows.insert(top, self._blank())
+            self.present[top:bottom + 1] = [False] + [True] * (bottom - top)
+        else:
+            self.cursor_up()
+
+    def linefeed(self):
+        self.index()
+        if LNM in self.mode:
+            self.carriage_return()
+
+    def tab(self):
+        for stop in sorted(self.tabstops):
+            if self.cursor.x < stop:
+                column = stop
+                break
+        else:
+            column = self.columns - 1
+        self.cursor.x = column
+
+    def backspace(self):
+        self.cursor_back()
+
+    def set_tab_stop(self):
+        self.tabstops.add(self.cursor.x)
+
+    def clear_tab_stop(self, how=0):
+        if how == 0:
+            self.tabstops.discard(self.cursor.x)
+        elif how == 3:
+            self.tabstops = set()
+
+    def save_cursor(self):
+        self.savepoints.append((self.cursor.x, self.cursor.y, DECOM in self.mode, DECAWM in self.mode))
+
+    def restore_cursor(self):
+        if self.savepoints:
+            x, y, origin, wrap = self.savepoints.pop()
+            if origin:
+                self.set_mode(DECOM)
+            if wrap:
+                self.set_mode(DECAWM)
+            self.cursor = Cursor(x, y)
+            self.ensure_hbounds()
+            self.ensure_vbounds(use_margins=True)
+        else:
+            self.reset_mode(DECOM)
+            self.cursor_position()
+
+    def ensure_hbounds(self):
+        self.cursor.x = min(max(0, self.cursor.x), self.columns - 1)
+
+    def ensure_vbounds(self, use_margins=None):
+        if (use_margins or DECOM in self.mode) and self.margins is not None:
+            top, bottom = self.margins
+        else:
+            top, bottom = 0, self.lines - 1
+        self.cursor.y = min(max(top, self.cursor.y), bottom)
+
+    def cursor_up(self, count=None):
+        top = self.margins[0] if self.margins else 0
+        self.cursor.y = max(self.cursor.y - (count or 1), top)
+
+    def cursor_up1(self, count=None):
+        self.cursor_up(count)
+        self.carriage_return()
+
+    def cursor_down(self, count=None):
+        bottom = self.margins[1] if self.margins else self.lines - 1
+        self.cursor.y = min(self.cursor.y + (count or 1), bottom)
+
+    def cursor_down1(self, count=None):
+        self.cursor_down(count)
+        self.carriage_return()
+
+    def cursor_back(self, count=None):
+        if self.cursor.x == self.columns:
+            self.cursor.x -= 1
+        self.cursor.x -= count or 1
+        self.ensure_hbounds()
+
+    def cursor_forward(self, count=None):
+        self.cursor.x += count or 1
+        self.ensure_hbounds()
+
+    def cursor_position(self, line=None, column=None):
+        column = (column or 1) - 1
+        line = (line or 1) - 1
+        if self.margins is not None and DECOM in self.mode:
+            line += self.margins[0]
+            if not self.margins[0] <= line <= self.margins[1]:
+                return
+        self.cursor.x = column
+        self.cursor.y = line
+        self.ensure_hbounds()
+        self.ensure_vbounds()
+
+    def cursor_to_column(self, column=None):
+        self.cursor.x = (column or 1) - 1
+        self.ensure_hbounds()
+
+    def cursor_to_line(self, line=None):
+        self.cursor.y = (line or 1) - 1
+        if DECOM in self.mode:
+            self.cursor.y += self.margins[0]
+        self.ensure_vbounds()
+
+    # Editing
+
+    def insert_lines(self, count=None):
+        count = count or 1
+        top, bottom = self.margins or (0, self.lines - 1)
+        y = self.cursor.y
+        if top <= y <= bottom:
+            self.dirty.update(range(y, self.lines))
+            for _ in range(min(count, bottom - y + 1)):
+                del self.rows[bottom]
+                self.rows.insert(y, self._blank())
+                del self.present[bottom]
+                self.present.insert(y, False)
+            self.carriage_return()
+
+    def delete_lines(self, count=None):
+        count = count or 1
+        top, bottom = self.margins or (0, self.lines - 1)
+        y = self.cursor.y
+        if top <= y <= bottom:
+            self.dirty.update(range(y, self.lines))
+            rows = self.rows
+            present = self.present
+            for y in range(y, bottom + 1):
+                if y + count > bottom:
+                    rows[y] = self._blank()
+                    present[y] = False
+                elif present[y + count]:
+                    rows[y] = rows[y + count]
+                    present[y] = True
+                    rows[y + count] = self._blank()
+                    present[y + count] = False
+            self.carriage_return()
+
+    def insert_characters(self, count=None):
+        self.dirty.add(self.cursor.y)
+        self.present[self.cursor.y] = True
+        count = count or 1
+        row = self.rows[self.cursor.y]
+        x = self.cursor.x
+        row[x:x] = [' '] * count
+        del row[self.columns + 1:]
+
+    def delete_characters(self, count=None):
+        self.dirty.add(self.cursor.y)
+        self.present[self.cursor.y] = True
+        count = count or 1
+        row = self.rows[self.cursor.y]
+        x = self.cursor.x
+        if x + count > self.columns:
+            row[x:self.columns] = [' '] * max(self.columns - x, 0)
+        else:
+            del row[x:x + count]
+            row.extend([' '] * (self.columns + 1 - len(row)))
+
+    def erase_characters(self, count=None):
+        self.dirty.add(self.cursor.y)
+        self.present[self.cursor.y] = True
+        count = count or 1
+        x = self.cursor.x
+        end = min(x + count, self.columns)
+        self.rows[self.cursor.y][x:end] = [' '] * max(end - x, 0)
+
+    def erase_in_line(self, how=0, private=False):
+        self.dirty.add(self.cursor.y)
+        row = self.rows[self.cursor.y]
+        x = min(self.cursor.x, self.columns)
+        if how == 0:
+            row[x:self.columns] = [' '] * (self.columns - x)
+        elif how == 1:
+            row[:x + 1] = [' '] * (x + 1)
+        elif how == 2:
+            row[:self.columns] = [' '] * self.columns
+        else:
+            raise ValueError(f"erase_in_line: unknown mode {how}")
+        self.present[self.cursor.y] = True
+
+    def erase_in_display(self, how=0, *args, **kwargs):
+        if how == 0:
+            interval = range(self.cursor.y + 1, self.lines)
+        elif how == 1:
+            interval = range(self.cursor.y)
+        elif how == 2 or how == 3:
+            interval = range(self.lines)
+            self.scrolled += self.lines
+        else:
+            raise ValueError(f"erase_in_display: unknown mode {how}")
+        self.dirty.update(interval)
+        for y in interval:
+            self.rows[y] = self._blank()
+            self.present[y] = True
+        if how == 0 or how == 1:
+            self.erase_in_line(how)